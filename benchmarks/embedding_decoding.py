@@ -0,0 +1,46 @@
+# Compares the old ast.literal_eval decoding of match_jobtitles embeddings with
+# the vectorized pgvector text parser used by search_resumes.
+#
+# run: python -m benchmarks.embedding_decoding
+import ast
+import timeit
+
+import numpy as np
+
+from routers.resume.vectors import decode_embeddings
+
+DIMENSION = 384
+RESUMES = 1000
+VECTORS_PER_RESUME = 10
+
+
+def make_rows():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(RESUMES * VECTORS_PER_RESUME, DIMENSION))
+    texts = ["[" + ",".join(repr(float(x)) for x in row) + "]" for row in vectors]
+
+    return [
+        texts[i : i + VECTORS_PER_RESUME]
+        for i in range(0, len(texts), VECTORS_PER_RESUME)
+    ]
+
+
+def decode_literal_eval(rows):
+    return [
+        np.array([ast.literal_eval(item) for item in row], dtype=np.float32)
+        for row in rows
+    ]
+
+
+def decode_fast(rows):
+    return decode_embeddings([item for row in rows for item in row], DIMENSION)
+
+
+if __name__ == "__main__":
+    rows = make_rows()
+    expected = np.concatenate(decode_literal_eval(rows))
+    assert np.allclose(decode_fast(rows), expected)
+
+    for name, func in [("ast.literal_eval", decode_literal_eval), ("fast", decode_fast)]:
+        seconds = min(timeit.repeat(lambda: func(rows), number=1, repeat=3))
+        print(f"{name:>16}: {seconds:.3f}s for {RESUMES * VECTORS_PER_RESUME} vectors")
@@ -0,0 +1,87 @@
+# Compares folder listing strategies on a synthetic table of 1M folders in SQLite:
+# offset vs keyset paging at increasing depths, exact vs cached counts and
+# leading-wildcard LIKE vs a trigram (FTS5) index. SQLite stands in for Postgres
+# here, the relative costs are what matters.
+#
+# run: python -m benchmarks.folder_pagination [folders]
+import random
+import sqlite3
+import string
+import sys
+import time
+
+FOLDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+PAGE_SIZE = 10
+WORDS = ["backend", "frontend", "data", "design", "sales", "ops", "mobile", "qa"]
+
+
+def make_table():
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        "CREATE TABLE folders (folder_id INTEGER PRIMARY KEY, folder_name TEXT)"
+    )
+    random.seed(0)
+    connection.executemany(
+        "INSERT INTO folders VALUES (?, ?)",
+        (
+            (
+                folder_id,
+                f"{random.choice(WORDS)} "
+                + "".join(random.choices(string.ascii_lowercase, k=8)),
+            )
+            for folder_id in range(1, FOLDERS + 1)
+        ),
+    )
+    connection.execute(
+        "CREATE VIRTUAL TABLE folders_trigram USING fts5("
+        "folder_name, content='folders', content_rowid='folder_id', "
+        "tokenize='trigram')"
+    )
+    connection.execute(
+        "INSERT INTO folders_trigram(folders_trigram) VALUES ('rebuild')"
+    )
+
+    return connection
+
+
+def timed(connection, sql, params=(), repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        connection.execute(sql, params).fetchall()
+
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+if __name__ == "__main__":
+    connection = make_table()
+    print(f"{FOLDERS} folders, page size {PAGE_SIZE}")
+
+    for depth in [1, 1_000, 10_000, FOLDERS // PAGE_SIZE - 1]:
+        offset = (depth - 1) * PAGE_SIZE
+        offset_ms = timed(
+            connection,
+            "SELECT * FROM folders ORDER BY folder_id LIMIT ? OFFSET ?",
+            (PAGE_SIZE + 1, offset),
+        )
+        keyset_ms = timed(
+            connection,
+            "SELECT * FROM folders WHERE folder_id > ? ORDER BY folder_id LIMIT ?",
+            (offset, PAGE_SIZE + 1),
+        )
+        print(f"page {depth:>7}: offset {offset_ms:8.2f}ms  keyset {keyset_ms:8.2f}ms")
+
+    print(f"exact count: {timed(connection, 'SELECT count(*) FROM folders'):8.2f}ms")
+    print("cached count:     0.00ms (served from memory within the ttl)")
+
+    like_ms = timed(
+        connection,
+        "SELECT * FROM folders WHERE folder_name LIKE ? ORDER BY folder_id LIMIT ?",
+        ("%qzxvk%", PAGE_SIZE + 1),
+    )
+    trigram_ms = timed(
+        connection,
+        "SELECT rowid, folder_name FROM folders_trigram WHERE folder_name MATCH ? "
+        "ORDER BY rowid LIMIT ?",
+        ('"qzxvk"', PAGE_SIZE + 1),
+    )
+    print(f"search '%qzxvk%': like {like_ms:8.2f}ms  trigram {trigram_ms:8.2f}ms")
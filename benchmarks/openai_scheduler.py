@@ -0,0 +1,135 @@
+# Drives the LLM scheduler against a local mock of the chat completions API that
+# answers slowly and returns 429s above its own rate limit, the way batch ingestion
+# calls parseResume from a pool of threads.
+#
+# run: python -m benchmarks.openai_scheduler [requests]
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai_client.scheduler import LLMScheduler
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+DUPLICATES = 10
+MOCK_LATENCY_SECONDS = 0.2
+MOCK_REQUESTS_PER_SECOND = 20
+
+
+class MockCompletions(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    window = []
+    served = 0
+    rejected = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with self.lock:
+            now = time.monotonic()
+            MockCompletions.window = [t for t in self.window if now - t < 1]
+            limited = len(self.window) >= MOCK_REQUESTS_PER_SECOND
+            if limited:
+                MockCompletions.rejected += 1
+            else:
+                self.window.append(now)
+                MockCompletions.served += 1
+
+        if limited:
+            return self._reply(
+                429, {"error": {"message": "Rate limit reached"}}, {"retry-after": "1"}
+            )
+
+        time.sleep(MOCK_LATENCY_SECONDS)
+        self._reply(
+            200,
+            {
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "None"},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 100,
+                    "completion_tokens": 20,
+                    "total_tokens": 120,
+                },
+            },
+        )
+
+    def _reply(self, status: int, payload: dict, headers: dict = {}):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(requests_per_minute: int, burst_seconds: float):
+    MockCompletions.window = []
+    MockCompletions.served = MockCompletions.rejected = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockCompletions)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    scheduler = LLMScheduler(
+        api_key="mock",
+        base_url=f"http://127.0.0.1:{server.server_port}/v1",
+        max_concurrency=8,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=1_000_000,
+        max_retries=8,
+        burst_seconds=burst_seconds,
+    )
+    # the first DUPLICATES texts are sent twice in a row to show coalescing
+    texts = [
+        f"resume {i}"
+        for i in range(REQUESTS - DUPLICATES)
+        for _ in range(2 if i < DUPLICATES else 1)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(32) as pool:
+        list(
+            pool.map(
+                lambda text: scheduler.complete(
+                    "gpt-3.5-turbo-1106",
+                    [{"role": "user", "content": text}],
+                    temperature=0,
+                ),
+                texts,
+            )
+        )
+    elapsed = time.perf_counter() - started
+
+    metrics = scheduler.get_metrics()
+    scheduler.shutdown()
+    server.shutdown()
+
+    print(
+        f"rpm={requests_per_minute:>7} burst={burst_seconds}s: "
+        f"{len(texts)} calls in {elapsed:.2f}s, "
+        f"mock served {MockCompletions.served} rejected {MockCompletions.rejected}, "
+        f"coalesced {metrics['coalesced']}, retries {metrics['retries']}, "
+        f"mean latency {metrics['latency_seconds']['mean']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    # no client side limit: every burst runs into the server's 429s
+    run(requests_per_minute=1_000_000, burst_seconds=1)
+    # limited just under the server's rate
+    run(requests_per_minute=(MOCK_REQUESTS_PER_SECOND - 2) * 60, burst_seconds=1)
@@ -0,0 +1,38 @@
+# Times every PDF extractor over a folder of sample resumes.
+#
+# run: python -m benchmarks.pdf_extraction path/to/resumes
+import sys
+import time
+from pathlib import Path
+
+from routers.resume.extraction import (
+    PDF_EXTRACTORS,
+    extract_pdf_text,
+    is_readable_text_layer,
+)
+
+EXTRACTORS = {**PDF_EXTRACTORS, "auto": extract_pdf_text}
+
+
+if __name__ == "__main__":
+    paths = sorted(Path(sys.argv[1]).glob("**/*.pdf"))
+    totals = {name: 0.0 for name in EXTRACTORS}
+
+    for path in paths:
+        row = [path.name[:40].ljust(40)]
+        for name, extract in EXTRACTORS.items():
+            with open(path, "rb") as file:
+                started = time.perf_counter()
+                text = extract(file)
+                seconds = time.perf_counter() - started
+            totals[name] += seconds
+            row.append(f"{name}={seconds:.3f}s/{len(text)}ch")
+
+        with open(path, "rb") as file:
+            fast_path = is_readable_text_layer(PDF_EXTRACTORS["text_layer"](file))
+        row.append("fast path" if fast_path else "fallback")
+        print("  ".join(row))
+
+    print(f"{len(paths)} files")
+    for name, seconds in totals.items():
+        print(f"{name:>12}: {seconds:.3f}s total")
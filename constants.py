@@ -1,3 +1,7 @@
+API_PREFIX = "/api"
+RESUME_PREFIX = "/resume"
+RESUME_THUMBNAIL_PATH = "/{resume_id}/thumbnail"
+
 BUCKET_NAME = "talent-discovery-bucket"
 RESUMES_BUCKET = "talent-discovery-resumes"
 THUMBNAILS_BUCKET = "talent-discovery-thumbnails"
@@ -6,3 +10,5 @@ KB = 1024
 MAX_SIZE_IN_MB = 1024 * KB
 
 SUPPORTED_FILE_TYPES = {"application/pdf": "pdf"}
+
+ZIP_FILE_TYPES = {"application/zip", "application/x-zip-compressed"}
@@ -0,0 +1,146 @@
+import fcntl
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    # the MiniLM tokenizer is uncased and ignores extra whitespace, so these
+    # variants encode to the same vector
+    return " ".join((text or "").split()).lower()
+
+
+class EmbeddingCache:
+    # In-memory LRU in front of an append-only float32 file on disk. Row i of
+    # vectors.f32 belongs to line i of keys.txt, the file is memory-mapped and
+    # shared by every worker process.
+    def __init__(self, directory: str, model_name: str, memory_size: int):
+        self.directory = Path(directory) / re.sub(r"[^\w.-]", "_", model_name)
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.rows = {}
+        self.row_count = 0
+        self.keys_offset = 0
+        self.dimension = None
+        self.vectors = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, texts: List[str]) -> List[np.ndarray | None]:
+        with self._lock:
+            keys = [normalize_text(text) for text in texts]
+            if any(key not in self.memory and key not in self.rows for key in keys):
+                self._refresh()
+
+            return [self._get(key) for key in keys]
+
+    def set_many(self, texts: List[str], vectors: np.ndarray):
+        keys = [normalize_text(text) for text in texts]
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+
+            self._append(keys, vectors)
+
+    def get_metrics(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+
+        return {
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.rows),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                (self.memory_hits + self.disk_hits) / lookups if lookups else None
+            ),
+        }
+
+    def _get(self, key: str):
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        row = self.rows.get(key)
+        if row is not None and self.vectors is not None and row < len(self.vectors):
+            vector = np.array(self.vectors[row])
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+        self.misses += 1
+        return None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def _refresh(self):
+        # pick up rows appended by other processes since the last read
+        keys_path = self.directory / "keys.txt"
+        if not keys_path.exists():
+            return
+
+        if self.dimension is None:
+            meta = json.loads((self.directory / "meta.json").read_text())
+            self.dimension = meta["dimension"]
+
+        with open(keys_path, "rb") as file:
+            file.seek(self.keys_offset)
+            data = file.read()
+
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].decode().splitlines():
+            self.rows[line] = self.row_count
+            self.row_count += 1
+        self.keys_offset += complete
+
+        self._map_vectors()
+
+    def _map_vectors(self):
+        vectors_path = self.directory / "vectors.f32"
+        if not self.row_count or not vectors_path.exists():
+            return
+
+        self.vectors = np.memmap(
+            vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.row_count, self.dimension),
+        )
+
+    def _append(self, keys: List[str], vectors: np.ndarray):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with open(self.directory / "lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            meta_path = self.directory / "meta.json"
+            if not meta_path.exists():
+                meta_path.write_text(json.dumps({"dimension": vectors.shape[1]}))
+            self.dimension = vectors.shape[1]
+            self._refresh()
+
+            with open(self.directory / "vectors.f32", "ab") as file:
+                # drop vectors of a writer that died before writing their keys
+                file.truncate(self.row_count * self.dimension * 4)
+                file.write(vectors.tobytes())
+
+            with open(self.directory / "keys.txt", "a") as file:
+                file.write("".join(f"{key}\n" for key in keys))
+
+            self._refresh()
+
@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import List
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from configs import env_configs
+from .cache import EmbeddingCache, normalize_text
+
+EMBEDDING_MODEL_NAME = env_configs.get(
+    "EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"
+)
+EMBEDDING_CACHE_ENABLED = env_configs.get("EMBEDDING_CACHE_ENABLED", "true") == "true"
+EMBEDDING_CACHE_DIR = env_configs.get("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_MEMORY_SIZE = int(env_configs.get("EMBEDDING_CACHE_MEMORY_SIZE", 50000))
+
+
+class EmbeddingEngine:
+    def __init__(self, model_name: str, cache: EmbeddingCache | None = None):
+        self.model_name = model_name
+        self.cache = cache
+        self.model: SentenceTransformer | None = None
+        self.load_seconds: float | None = None
+        self.encode_calls = 0
+        self.encoded_texts = 0
+        self.encode_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> SentenceTransformer:
+        if self.model is not None:
+            return self.model
+
+        with self._lock:
+            if self.model is None:
+                started = time.perf_counter()
+                self.model = SentenceTransformer(self.model_name)
+                self.load_seconds = time.perf_counter() - started
+
+        return self.model
+
+    def encode_many(self, texts: List[str]) -> np.ndarray:
+        if not self.cache:
+            return self._encode(texts)
+
+        vectors = self.cache.get_many(texts)
+        missing_texts = {
+            normalize_text(text): text
+            for text, vector in zip(texts, vectors)
+            if vector is None
+        }
+
+        if missing_texts:
+            missing_vectors = self._encode(list(missing_texts.values()))
+            self.cache.set_many(list(missing_texts.values()), missing_vectors)
+            encoded = dict(zip(missing_texts, missing_vectors))
+            vectors = [
+                encoded[normalize_text(text)] if vector is None else vector
+                for text, vector in zip(texts, vectors)
+            ]
+
+        if not vectors:
+            return self._encode(texts)
+
+        return np.stack(vectors)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        model = self.load()
+
+        started = time.perf_counter()
+        vectors = model.encode(texts, convert_to_numpy=True)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.encode_calls += 1
+            self.encoded_texts += len(texts)
+            self.encode_seconds += elapsed
+
+        return vectors.astype(np.float32, copy=False)
+
+    def encode(self, text: str) -> List[float]:
+        return self.encode_many([text])[0].tolist()
+
+    def get_metrics(self):
+        return {
+            "model_name": self.model_name,
+            "loaded": self.model is not None,
+            "load_seconds": self.load_seconds,
+            "encode_calls": self.encode_calls,
+            "encoded_texts": self.encoded_texts,
+            "encode_seconds": self.encode_seconds,
+            "texts_per_second": (
+                self.encoded_texts / self.encode_seconds
+                if self.encode_seconds
+                else None
+            ),
+            "cache": self.cache.get_metrics() if self.cache else None,
+        }
+
+
+embedding_engine = EmbeddingEngine(
+    EMBEDDING_MODEL_NAME,
+    EmbeddingCache(
+        EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME, EMBEDDING_CACHE_MEMORY_SIZE
+    )
+    if EMBEDDING_CACHE_ENABLED
+    else None,
+)
@@ -0,0 +1,157 @@
+import asyncio
+import inspect
+import time
+import uuid
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, Callable, Dict
+
+from fastapi import status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from configs import env_configs
+from exception import UnicornException
+
+JOB_WORKERS = int(env_configs.get("JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(env_configs.get("JOB_QUEUE_SIZE", 100))
+JOB_MAX_RETRIES = int(env_configs.get("JOB_MAX_RETRIES", 2))
+JOB_RETRY_DELAY_SECONDS = float(env_configs.get("JOB_RETRY_DELAY_SECONDS", 1))
+JOB_RETENTION_SECONDS = int(env_configs.get("JOB_RETENTION_SECONDS", 3600))
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    job_id: str
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    result: Any = None
+    error: Any = None
+    progress: Dict[str, Any] | None = None
+    created_at: float
+    finished_at: float | None = None
+
+
+# the job being run; asyncio.to_thread copies it into the worker thread
+current_job: ContextVar[Job | None] = ContextVar("current_job", default=None)
+
+
+def report_progress(**progress):
+    job = current_job.get()
+    if job is not None:
+        job.progress = {**(job.progress or {}), **progress}
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        max_retries: int,
+        retry_delay: float,
+        retention: int,
+    ):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self.jobs: Dict[str, Job] = {}
+        self.queue: asyncio.Queue | None = None
+        self.workers = []
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [
+            asyncio.create_task(self._work()) for _ in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, func: Callable, *args) -> Job:
+        self._prune()
+
+        job = Job(job_id=str(uuid.uuid4()), created_at=time.time())
+        try:
+            self.queue.put_nowait((job, func, args))
+        except asyncio.QueueFull:
+            raise UnicornException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                message="Too many jobs in progress, try again later",
+                type="job.queue.full",
+            )
+
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+
+        if not job:
+            raise UnicornException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message="Job not found",
+                type="job.not.found",
+            )
+
+        return job
+
+    def _prune(self):
+        expired_before = time.time() - self.retention
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at < expired_before:
+                del self.jobs[job_id]
+
+    async def _work(self):
+        while True:
+            job, func, args = await self.queue.get()
+            try:
+                await self._run(job, func, args)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Job, func: Callable, args: tuple):
+        job.status = JobStatus.RUNNING
+        current_job.set(job)
+
+        while True:
+            job.attempts += 1
+            try:
+                if inspect.iscoroutinefunction(func):
+                    job.result = await func(*args)
+                else:
+                    job.result = await asyncio.to_thread(func, *args)
+                job.status = JobStatus.SUCCEEDED
+                break
+            except UnicornException as e:
+                # client errors (not a resume, empty file...) are not retried
+                job.error = jsonable_encoder(e)
+                job.status = JobStatus.FAILED
+                break
+            except Exception as e:
+                if job.attempts > self.max_retries:
+                    job.error = {"message": str(e), "type": type(e).__name__}
+                    job.status = JobStatus.FAILED
+                    break
+                await asyncio.sleep(self.retry_delay * 2 ** (job.attempts - 1))
+
+        job.finished_at = time.time()
+
+
+job_queue = JobQueue(
+    JOB_WORKERS,
+    JOB_QUEUE_SIZE,
+    JOB_MAX_RETRIES,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_RETENTION_SECONDS,
+)
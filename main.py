@@ -3,17 +3,27 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from embedding_client.main import embedding_engine
+from constants import API_PREFIX
 from exception import UnicornException
+from jobs.main import job_queue
+from openai_client.scheduler import llm_scheduler
+from routers.resume.keywords import keyword_sync
+from routers.resume.pdf_pool import pdf_pool
+from routers.resume.services import validate_api_base_url
+from routers.folder.services import folder_delete_queue
+from supabase_client.main import close_async_clients
 
 from routers.resume.main import resumeRouter
 from routers.folder.main import folderRouter
 from routers.user.main import userRouter
+from routers.health.main import healthRouter
 
 app = FastAPI()
 
 origins = ["http://localhost:3000"]
 
-app.router.prefix = "/api"
+app.router.prefix = API_PREFIX
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +36,36 @@ app.add_middleware(
 app.include_router(resumeRouter)
 app.include_router(folderRouter)
 app.include_router(userRouter)
+app.include_router(healthRouter)
+
+
+@app.on_event("startup")
+def validate_configs():
+    validate_api_base_url()
+
+
+@app.on_event("startup")
+def load_embeddings():
+    embedding_engine.load()
+    keyword_sync.load()
+
+
+@app.on_event("startup")
+async def start_workers():
+    await job_queue.start()
+    await folder_delete_queue.start()
+    await keyword_sync.start()
+    pdf_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await job_queue.stop()
+    await folder_delete_queue.stop()
+    await keyword_sync.stop()
+    pdf_pool.shutdown()
+    await close_async_clients()
+    llm_scheduler.shutdown()
 
 
 @app.exception_handler(UnicornException)
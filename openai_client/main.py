@@ -1,9 +1,11 @@
+import hashlib
 from openai import OpenAI
 from configs import env_configs
 from .parse_resume_templates import resumeTemplate3
+from .scheduler import OPENAI_BASE_URL, llm_scheduler
 
 apiKey = env_configs.get("OPENAI_API_KEY")
-client = OpenAI(api_key=apiKey)
+client = OpenAI(api_key=apiKey, base_url=OPENAI_BASE_URL)
 
 
 def get_embedding(content: str):
@@ -11,18 +13,29 @@ def get_embedding(content: str):
     return response.data[0].embedding
 
 
-def parseResume(textContent: str, model="gpt-3.5-turbo-1106"):
+PARSE_RESUME_MODEL = "gpt-3.5-turbo-1106"
+PARSE_RESUME_PROMPT = f"""You will be provided with text.\
+            If it contains information about a resume then summarize the information into a JSON with exactly the following structure: {resumeTemplate3}. \
+            If the text does not contain information of a resume, then simply write None instead JSON schema."""
+
+
+def parse_resume_cache_key(resume_hash: str, model=PARSE_RESUME_MODEL):
+    # a new prompt or model must not be served results parsed by the old one
+    prompt_hash = hashlib.sha256(PARSE_RESUME_PROMPT.encode()).hexdigest()
+
+    return f"{resume_hash}:{model}:{prompt_hash}"
+
+
+def parseResume(textContent: str, model=PARSE_RESUME_MODEL):
     systemMessage = {
         "role": "system",
-        "content": f"""You will be provided with text.\
-            If it contains information about a resume then summarize the information into a JSON with exactly the following structure: {resumeTemplate3}. \
-            If the text does not contain information of a resume, then simply write None instead JSON schema.""",
+        "content": PARSE_RESUME_PROMPT,
     }
     messages = [systemMessage, {"role": "user", "content": textContent}]
-    response = client.chat.completions.create(
+
+    # rate limits, retries and coalescing are handled by the shared scheduler
+    return llm_scheduler.complete(
         model=model,
         messages=messages,
         temperature=0,  # this is the degree of randomness of the model's output
     )
-
-    return response.choices[0].message.content
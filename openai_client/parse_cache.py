@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from configs import env_configs
+
+PARSE_CACHE_PATH = env_configs.get("PARSE_CACHE_PATH", ".cache/parse_cache.sqlite3")
+PARSE_CACHE_MAX_BYTES = int(env_configs.get("PARSE_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+
+class ParseCache:
+    # disk-backed, least recently used entries are evicted past max_bytes
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.connection is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS parse_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS parse_cache_accessed_at "
+                "ON parse_cache (accessed_at)"
+            )
+
+        return self.connection
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value FROM parse_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            connection.execute(
+                "UPDATE parse_cache SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            return row[0]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM parse_cache"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in connection.execute(
+            "SELECT key, size FROM parse_cache ORDER BY accessed_at"
+        ).fetchall():
+            if total - evicted <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+            evicted += size
+
+
+parse_cache = ParseCache(PARSE_CACHE_PATH, PARSE_CACHE_MAX_BYTES)
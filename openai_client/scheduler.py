@@ -0,0 +1,284 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict, List
+
+import openai
+from openai import AsyncOpenAI
+
+from configs import env_configs
+
+OPENAI_BASE_URL = env_configs.get("OPENAI_BASE_URL") or None
+OPENAI_MAX_CONCURRENCY = int(env_configs.get("OPENAI_MAX_CONCURRENCY", 8))
+OPENAI_REQUESTS_PER_MINUTE = int(env_configs.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+OPENAI_TOKENS_PER_MINUTE = int(env_configs.get("OPENAI_TOKENS_PER_MINUTE", 60000))
+OPENAI_MAX_RETRIES = int(env_configs.get("OPENAI_MAX_RETRIES", 5))
+OPENAI_RETRY_BASE_SECONDS = float(env_configs.get("OPENAI_RETRY_BASE_SECONDS", 1))
+OPENAI_RETRY_MAX_SECONDS = float(env_configs.get("OPENAI_RETRY_MAX_SECONDS", 30))
+OPENAI_TIMEOUT_SECONDS = float(env_configs.get("OPENAI_TIMEOUT_SECONDS", 120))
+# how much of the per-minute budget may be spent at once
+OPENAI_BURST_SECONDS = float(env_configs.get("OPENAI_BURST_SECONDS", 5))
+# completion tokens reserved up front, corrected with the reported usage afterwards
+OPENAI_COMPLETION_TOKENS_ESTIMATE = int(
+    env_configs.get("OPENAI_COMPLETION_TOKENS_ESTIMATE", 1000)
+)
+
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120]
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    # Refills continuously at per_minute / 60 a second and holds at most
+    # burst_seconds of that. A request larger than the bucket waits for a full
+    # bucket and leaves it in debt, so the long run rate still holds.
+    def __init__(self, per_minute: int, burst_seconds: float):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount: float):
+        while True:
+            self._refill()
+            if self.tokens >= min(amount, self.capacity):
+                self.tokens -= amount
+                return
+
+            await asyncio.sleep((min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def adjust(self, amount: float):
+        # positive gives back an over-estimate, negative charges an under-estimate
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class Histogram:
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def get_metrics(self):
+        count = sum(self.counts)
+
+        return {
+            "count": count,
+            "mean": self.total / count if count else None,
+            "buckets": {
+                **{f"le_{le}": n for le, n in zip(self.buckets, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class LLMScheduler:
+    # Runs chat completions on its own event loop thread so both the async
+    # routes and the sync job/batch threads share one set of limits.
+    def __init__(
+        self,
+        api_key: str | None,
+        base_url: str | None,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        burst_seconds: float = OPENAI_BURST_SECONDS,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.burst_seconds = burst_seconds
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self.in_flight_requests: Dict[str, asyncio.Future] = {}
+        self.waiting = 0
+        self.running = 0
+        self.requests = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.upstream_latency = Histogram(LATENCY_BUCKETS)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.loop is not None:
+                return self.loop
+
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=loop.run_forever, name="llm-scheduler", daemon=True
+            )
+            self.thread.start()
+            # limits are created on the loop that uses them
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self.loop = loop
+
+            return loop
+
+    def shutdown(self):
+        with self._lock:
+            if self.loop is None:
+                return
+
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+
+    def complete(self, model: str, messages: List[dict], **options) -> str:
+        return self.submit(model, messages, **options).result()
+
+    def submit(self, model: str, messages: List[dict], **options):
+        loop = self.start()
+
+        return asyncio.run_coroutine_threadsafe(
+            self.acomplete(model, messages, **options), loop
+        )
+
+    async def acomplete(self, model: str, messages: List[dict], **options) -> str:
+        key = hashlib.sha256(
+            json.dumps([model, messages, options], sort_keys=True).encode()
+        ).hexdigest()
+
+        # identical requests in flight share one upstream call
+        future = self.in_flight_requests.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight_requests[key] = future
+        started = time.perf_counter()
+        try:
+            content = await self._complete(model, messages, options)
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.failures += 1
+            future.set_exception(e)
+            # marks the error as retrieved, it is raised to the caller right here
+            future.exception()
+            raise
+        finally:
+            del self.in_flight_requests[key]
+            self.latency.observe(time.perf_counter() - started)
+
+    async def _setup(self):
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=0,
+            timeout=OPENAI_TIMEOUT_SECONDS,
+        )
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+        self.request_bucket = TokenBucket(self.requests_per_minute, self.burst_seconds)
+        self.token_bucket = TokenBucket(self.tokens_per_minute, self.burst_seconds)
+
+    async def _complete(self, model: str, messages: List[dict], options: dict) -> str:
+        # ~4 characters per token is close enough to budget the minute
+        estimated_tokens = (
+            sum(len(message["content"]) for message in messages) // 4
+            + OPENAI_COMPLETION_TOKENS_ESTIMATE
+        )
+        attempt = 0
+
+        while True:
+            self.waiting += 1
+            try:
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(estimated_tokens)
+                await self.slots.acquire()
+            finally:
+                self.waiting -= 1
+
+            self.running += 1
+            self.requests += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model, messages=messages, **options
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+            else:
+                if response.usage:
+                    self.token_bucket.adjust(
+                        estimated_tokens - response.usage.total_tokens
+                    )
+                return response.choices[0].message.content
+            finally:
+                self.upstream_latency.observe(time.perf_counter() - started)
+                self.running -= 1
+                self.slots.release()
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: Exception, attempt: int):
+        response = getattr(error, "response", None)
+        retry_after = (
+            response.headers.get("retry-after") if response is not None else None
+        )
+        if retry_after:
+            try:
+                return min(float(retry_after), OPENAI_RETRY_MAX_SECONDS)
+            except ValueError:
+                pass
+
+        # full jitter keeps retrying workers from hitting the limit together
+        return random.uniform(
+            0, min(OPENAI_RETRY_MAX_SECONDS, OPENAI_RETRY_BASE_SECONDS * 2**attempt)
+        )
+
+    def get_metrics(self):
+        return {
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "in_flight_requests": len(self.in_flight_requests),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "failures": self.failures,
+            "latency_seconds": self.latency.get_metrics(),
+            "upstream_latency_seconds": self.upstream_latency.get_metrics(),
+        }
+
+
+llm_scheduler = LLMScheduler(
+    env_configs.get("OPENAI_API_KEY"),
+    OPENAI_BASE_URL,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_MAX_RETRIES,
+)
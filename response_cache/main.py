@@ -0,0 +1,194 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List
+
+import anyio
+from fastapi.encoders import jsonable_encoder
+
+from configs import env_configs
+
+RESPONSE_CACHE_ENABLED = env_configs.get("RESPONSE_CACHE_ENABLED", "true") == "true"
+RESPONSE_CACHE_BACKEND = env_configs.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_REDIS_URL = env_configs.get(
+    "RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0"
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(env_configs.get("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+RESPONSE_CACHE_TTL = int(env_configs.get("RESPONSE_CACHE_TTL", 300))
+# tag sets outlive every entry they point at
+RESPONSE_CACHE_TAG_TTL = 86400
+
+FOLDERS_TAG = "folders"
+
+
+def build_cache_key(route: str, params: Any, user_id: str | None = None):
+    params_hash = hashlib.md5(
+        json.dumps(jsonable_encoder(params), sort_keys=True).encode()
+    ).hexdigest()
+
+    return f"{route}:{user_id or '-'}:{params_hash}"
+
+
+class MemoryBackend:
+    # LRU of key -> (value, expires_at, tags) plus tag -> keys for invalidation;
+    # only sees writes made by this worker
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at, tags = entry
+            if time.monotonic() > expires_at:
+                self._remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, tags: List[str], ttl: int):
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, tags: List[str]):
+        with self._lock:
+            for tag in tags:
+                for key in self.tags.pop(tag, set()):
+                    self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry[2]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class RedisBackend:
+    # shared by every worker, so invalidations reach all of them
+    def __init__(self, url: str, prefix: str = "response_cache:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, tags: List[str], ttl: int):
+        pipeline = self.client.pipeline()
+        pipeline.setex(self.prefix + key, ttl, value)
+        for tag in tags:
+            pipeline.sadd(self._tag_key(tag), self.prefix + key)
+            pipeline.expire(self._tag_key(tag), RESPONSE_CACHE_TAG_TTL)
+        pipeline.execute()
+
+    def invalidate(self, tags: List[str]):
+        for tag in tags:
+            keys = self.client.smembers(self._tag_key(tag))
+            self.client.delete(self._tag_key(tag), *keys)
+
+    def _tag_key(self, tag: str):
+        return f"{self.prefix}tag:{tag}"
+
+
+class ResponseCache:
+    def __init__(self, backend: MemoryBackend | RedisBackend | None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        if self.backend is None:
+            return None
+
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, tags: List[str], ttl: int = RESPONSE_CACHE_TTL):
+        # stored as JSON so every backend returns the same plain data
+        value = jsonable_encoder(value)
+        if self.backend is not None:
+            self.backend.set(key, json.dumps(value), tags, ttl)
+
+        return value
+
+    def invalidate(self, *tags: str):
+        if self.backend is not None:
+            self.backend.invalidate(list(tags))
+
+    # async routes go through these, a redis round trip must not block the loop
+    async def get_async(self, key: str):
+        return await self._call(self.get, key)
+
+    async def set_async(
+        self, key: str, value: Any, tags: List[str], ttl: int = RESPONSE_CACHE_TTL
+    ):
+        return await self._call(self.set, key, value, tags, ttl)
+
+    async def invalidate_async(self, *tags: str):
+        return await self._call(self.invalidate, *tags)
+
+    async def _call(self, func: Callable, *args):
+        # the in-memory backend only takes a lock, a thread would cost more
+        if isinstance(self.backend, RedisBackend):
+            return await anyio.to_thread.run_sync(func, *args)
+
+        return func(*args)
+
+    def get_metrics(self):
+        lookups = self.hits + self.misses
+
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+def create_backend():
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(RESPONSE_CACHE_REDIS_URL)
+
+    return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(create_backend())
+
+
+def folder_tag(folder_id: str):
+    return f"folder:{folder_id}"
+
+
+def resume_tag(resume_id: str):
+    return f"resume:{resume_id}"
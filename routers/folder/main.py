@@ -1,15 +1,30 @@
 from fastapi import APIRouter, Depends, status
 from fastapi.encoders import jsonable_encoder
-from constants import RESUMES_BUCKET, THUMBNAILS_BUCKET
-from schemas import PageParams, PagedResponseSchema
-from supabase_client.main import get_storage_bucket, supabase_client
+from routers.user.schemes import UserContext
+from routers.user.services import get_current_user, get_optional_user
+from response_cache.main import (
+    FOLDERS_TAG,
+    build_cache_key,
+    folder_tag,
+    response_cache,
+)
+from schemas import CountMode, PageParams, PagedResponseSchema
+from supabase_client.main import as_user, async_supabase_client
 from supabase_client.table_names import FOLDER_TABLE_NAME
 import math
 
 from tags import FOLDER_TAG
 
 from .schemas import NewFolderSchema, UpdateFolderNameSchema
-
+from .services import (
+    FOLDER_COUNT_MODE,
+    decode_cursor,
+    delete_folder,
+    encode_cursor,
+    folder_counts,
+    folder_delete_queue,
+    get_count_method,
+)
 
 folderRouter = APIRouter(prefix="/folder")
 
@@ -18,61 +33,110 @@ folderRouter = APIRouter(prefix="/folder")
     "/all",
     tags=[FOLDER_TAG],
 )
-async def get_folder_list(page_params: PageParams = Depends(), search_value: str = ""):
-    start = (page_params.page - 1) * page_params.size
-    end = start + page_params.size
-
-    data, count = (
-        supabase_client.table(FOLDER_TABLE_NAME)
-        .select("*", count="exact")
-        .ilike("folder_name", f"%{search_value}%")
-        .range(start, end)
-    ).execute()
+async def get_folder_list(
+    page_params: PageParams = Depends(),
+    search_value: str = "",
+    count_mode: CountMode = FOLDER_COUNT_MODE,
+    current_user: UserContext | None = Depends(get_optional_user),
+):
+    cache_key = build_cache_key(
+        "folder.all",
+        [page_params, search_value, count_mode],
+        current_user and current_user.id,
+    )
+    cached_response = await response_cache.get_async(cache_key)
+    if cached_response is not None:
+        return cached_response
 
-    totalElements = count[1] or 0
-    results = data[1]
-    totalPages = math.ceil(totalElements / page_params.size)
+    cached_count = folder_counts.get(search_value)
+    query = async_supabase_client.table(FOLDER_TABLE_NAME).select(
+        "*", count=get_count_method(count_mode, cached_count)
+    )
+    if search_value:
+        # served by the folder_name trigram index
+        query = query.ilike("folder_name", f"%{search_value}%")
+    query = query.order("folder_id")
+
+    # one extra row tells whether there is a next page
+    if page_params.cursor:
+        after_folder_id = decode_cursor(page_params.cursor)
+        query = query.gt("folder_id", after_folder_id).limit(page_params.size + 1)
+    else:
+        start = (page_params.page - 1) * page_params.size
+        query = query.range(start, start + page_params.size)
+
+    data, count = await as_user(
+        query, current_user and current_user.access_token
+    ).execute()
+    results = data[1][: page_params.size]
+
+    if count_mode == CountMode.none:
+        totalElements = None
+    elif count_mode == CountMode.cached and cached_count is not None:
+        totalElements = cached_count
+    else:
+        totalElements = count[1] or 0
+        if count_mode == CountMode.cached:
+            folder_counts.set(search_value, totalElements)
+
+    totalPages = (
+        math.ceil(totalElements / page_params.size)
+        if totalElements is not None
+        else None
+    )
+    nextCursor = (
+        encode_cursor(results[-1]["folder_id"])
+        if len(data[1]) > page_params.size
+        else None
+    )
 
-    return PagedResponseSchema(
-        page=page_params.page,
-        size=page_params.size,
-        totalElements=totalElements,
-        totalPages=totalPages,
-        results=results,
+    return await response_cache.set_async(
+        cache_key,
+        PagedResponseSchema(
+            page=page_params.page,
+            size=page_params.size,
+            totalElements=totalElements,
+            totalPages=totalPages,
+            results=results,
+            nextCursor=nextCursor,
+        ),
+        [FOLDERS_TAG],
     )
 
 
 @folderRouter.post("/create", tags=[FOLDER_TAG])
-async def create_folder(folder: NewFolderSchema):
-    current_user = supabase_client.auth.get_user().user
-    supabase_client.table(FOLDER_TABLE_NAME).insert(
+async def create_folder(
+    folder: NewFolderSchema, current_user: UserContext = Depends(get_current_user)
+):
+    query = async_supabase_client.table(FOLDER_TABLE_NAME).insert(
         {"user_id": current_user.id, "folder_name": folder.folder_name}
-    ).execute()
+    )
+    await as_user(query, current_user.access_token).execute()
+    folder_counts.clear()
+    await response_cache.invalidate_async(FOLDERS_TAG)
 
 
 @folderRouter.delete("/remove/{folder_id}", tags=[FOLDER_TAG])
 async def removeFolder(folder_id: str):
-    supabase_client.table(FOLDER_TABLE_NAME).delete().eq(
-        "folder_id", folder_id
-    ).execute()
+    # the row and then its storage files are removed in the background, poll the
+    # job for progress; when the queue is full nothing is deleted
+    return folder_delete_queue.submit(delete_folder, folder_id)
 
-    remove_folder_files(THUMBNAILS_BUCKET, folder_id)
-    remove_folder_files(RESUMES_BUCKET, folder_id)
 
-
-def remove_folder_files(bucket_name: str, folder_id: str):
-    bucket = get_storage_bucket(bucket_name)
-    folder_path = f"folder_{folder_id}"
-    all_file_paths = [
-        f"{folder_path}/{file['name']}" for file in bucket.list(folder_path)
-    ]
-
-    if len(all_file_paths) > 0:
-        bucket.remove(all_file_paths)
+@folderRouter.get("/jobs/{job_id}", tags=[FOLDER_TAG])
+async def get_folder_job(job_id: str):
+    return folder_delete_queue.get(job_id)
 
 
 @folderRouter.patch("/update", tags=[FOLDER_TAG])
-async def updateFolder(folder: UpdateFolderNameSchema):
-    supabase_client.table(FOLDER_TABLE_NAME).update(
-        {"folder_name": folder.folder_name}
-    ).eq("folder_id", folder.folder_id).execute()
+async def updateFolder(
+    folder: UpdateFolderNameSchema,
+    current_user: UserContext | None = Depends(get_optional_user),
+):
+    query = (
+        async_supabase_client.table(FOLDER_TABLE_NAME)
+        .update({"folder_name": folder.folder_name})
+        .eq("folder_id", folder.folder_id)
+    )
+    await as_user(query, current_user and current_user.access_token).execute()
+    await response_cache.invalidate_async(FOLDERS_TAG, folder_tag(folder.folder_id))
@@ -0,0 +1,163 @@
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+from fastapi import status
+
+from configs import env_configs
+from constants import RESUMES_BUCKET, THUMBNAILS_BUCKET
+from exception import UnicornException
+from jobs.main import (
+    JOB_MAX_RETRIES,
+    JOB_RETENTION_SECONDS,
+    JOB_RETRY_DELAY_SECONDS,
+    JobQueue,
+    report_progress,
+)
+from response_cache.main import FOLDERS_TAG, folder_tag, response_cache
+from routers.resume.index import RESUME_INDEX_ENABLED, resume_index
+from routers.resume.services import known_resume_hashes
+from routers.resume.thumbnails import thumbnail_store
+from schemas import CountMode
+from supabase_client.main import get_storage_bucket, supabase_client
+from supabase_client.table_names import FOLDER_TABLE_NAME
+
+FOLDER_COUNT_MODE = CountMode(env_configs.get("FOLDER_COUNT_MODE", "estimated"))
+FOLDER_COUNT_CACHE_TTL = int(env_configs.get("FOLDER_COUNT_CACHE_TTL", 60))
+# storage removes at most 1000 objects per request
+FOLDER_DELETE_BATCH_SIZE = int(env_configs.get("FOLDER_DELETE_BATCH_SIZE", 1000))
+FOLDER_DELETE_WORKERS = int(env_configs.get("FOLDER_DELETE_WORKERS", 8))
+# folder deletes run on their own queue so they never hold the upload workers
+FOLDER_DELETE_JOB_WORKERS = int(env_configs.get("FOLDER_DELETE_JOB_WORKERS", 1))
+FOLDER_DELETE_QUEUE_SIZE = int(env_configs.get("FOLDER_DELETE_QUEUE_SIZE", 100))
+FOLDER_LIST_PAGE_SIZE = 1000
+
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise UnicornException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message="Invalid page cursor",
+            type="page.cursor.invalid",
+        )
+
+
+class CountCache:
+    # exact counts per search value, refreshed after the ttl or when folders
+    # are created or removed by this worker
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, search_value: str) -> int | None:
+        with self._lock:
+            entry = self.counts.get(search_value)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return None
+
+            return entry[0]
+
+    def set(self, search_value: str, count: int):
+        with self._lock:
+            self.counts[search_value] = (count, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self.counts.clear()
+
+
+folder_counts = CountCache(FOLDER_COUNT_CACHE_TTL)
+
+
+def get_count_method(count_mode: CountMode, cached_count: int | None):
+    if count_mode == CountMode.none:
+        return None
+
+    if count_mode == CountMode.cached:
+        return None if cached_count is not None else CountMode.exact.value
+
+    return count_mode.value
+
+
+def list_folder_files(bucket_name: str, folder_id: str) -> List[str]:
+    bucket = get_storage_bucket(bucket_name)
+    folder_path = f"folder_{folder_id}"
+    file_paths = []
+
+    while True:
+        files = bucket.list(
+            folder_path, {"limit": FOLDER_LIST_PAGE_SIZE, "offset": len(file_paths)}
+        )
+        file_paths += [f"{folder_path}/{file['name']}" for file in files]
+
+        if len(files) < FOLDER_LIST_PAGE_SIZE:
+            return file_paths
+
+
+def remove_files(bucket_name: str, file_paths: List[str]):
+    get_storage_bucket(bucket_name).remove(file_paths)
+
+    return len(file_paths)
+
+
+def delete_folder_files(folder_id: str):
+    # every page is listed before anything is removed, removing while paging
+    # would shift the offsets and skip files; a retried job lists what is left
+    batches = []
+    for bucket_name in [RESUMES_BUCKET, THUMBNAILS_BUCKET]:
+        file_paths = list_folder_files(bucket_name, folder_id)
+        batches += [
+            (bucket_name, file_paths[start : start + FOLDER_DELETE_BATCH_SIZE])
+            for start in range(0, len(file_paths), FOLDER_DELETE_BATCH_SIZE)
+        ]
+
+    total_files = sum(len(file_paths) for _, file_paths in batches)
+    removed_files = 0
+    report_progress(total_files=total_files, removed_files=removed_files)
+
+    with ThreadPoolExecutor(FOLDER_DELETE_WORKERS) as pool:
+        removals = [
+            pool.submit(remove_files, bucket_name, file_paths)
+            for bucket_name, file_paths in batches
+        ]
+        for removal in as_completed(removals):
+            removed_files += removal.result()
+            report_progress(removed_files=removed_files)
+
+    return {"folder_id": folder_id, "removed_files": removed_files}
+
+
+def delete_folder(folder_id: str):
+    # the row goes first and files are only touched once it is gone, so a failed
+    # delete leaves the folder whole; a retried job finds the row already deleted
+    supabase_client.table(FOLDER_TABLE_NAME).delete().eq(
+        "folder_id", folder_id
+    ).execute()
+
+    folder_counts.clear()
+    response_cache.invalidate(FOLDERS_TAG, folder_tag(folder_id))
+    if RESUME_INDEX_ENABLED:
+        resume_index.invalidate(folder_id)
+    known_resume_hashes.discard_folder(folder_id)
+    thumbnail_store.discard_folder(folder_id)
+
+    return delete_folder_files(folder_id)
+
+
+folder_delete_queue = JobQueue(
+    FOLDER_DELETE_JOB_WORKERS,
+    FOLDER_DELETE_QUEUE_SIZE,
+    JOB_MAX_RETRIES,
+    JOB_RETRY_DELAY_SECONDS,
+    JOB_RETENTION_SECONDS,
+)
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from embedding_client.main import embedding_engine
+from openai_client.scheduler import llm_scheduler
+from response_cache.main import response_cache
+
+from tags import HEALTH_TAG
+
+healthRouter = APIRouter(prefix="/health")
+
+
+@healthRouter.get("/embedding", tags=[HEALTH_TAG])
+async def get_embedding_health():
+    return embedding_engine.get_metrics()
+
+
+@healthRouter.get("/response_cache", tags=[HEALTH_TAG])
+async def get_response_cache_health():
+    return response_cache.get_metrics()
+
+
+@healthRouter.get("/openai", tags=[HEALTH_TAG])
+async def get_openai_health():
+    return llm_scheduler.get_metrics()
@@ -0,0 +1,275 @@
+import asyncio
+import mimetypes
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List
+
+from fastapi import UploadFile, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+
+from configs import env_configs
+from constants import ZIP_FILE_TYPES
+from exception import UnicornException
+from routers.resume.extraction import extract_resume_text
+from routers.resume.pdf_pool import PDF_POOL_WORKERS, pdf_pool
+from routers.resume.rendering import render_thumbnails
+from routers.resume.services import (
+    calculate_hash_stream,
+    embed_resume_data,
+    extract_resume,
+    find_resumes_by_hashes,
+    get_cached_resume_data,
+    THUMBNAIL_EAGER,
+    remove_uploaded_files,
+    save_resume_data,
+    upload_resume_file,
+    upload_thumbnails,
+    validate_file,
+)
+
+BATCH_LLM_WORKERS = int(env_configs.get("BATCH_LLM_WORKERS", 8))
+BATCH_IO_WORKERS = int(env_configs.get("BATCH_IO_WORKERS", 16))
+
+
+class BatchSpool:
+    # New files of a batch are appended to one unlinked temp file and every stage
+    # reads its file back when it runs, so only the files being worked on are in
+    # memory and a batch holds a single file descriptor.
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+
+    def add(self, source: BinaryIO):
+        offset = self.file.tell()
+        shutil.copyfileobj(source, self.file)
+        self.file.flush()
+
+        return offset, self.file.tell() - offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        # pread does not move the file position, concurrent stages can share it
+        return os.pread(self.file.fileno(), length, offset)
+
+    def close(self):
+        self.file.close()
+
+
+class BatchItem:
+    def __init__(
+        self,
+        filename: str,
+        spool: BatchSpool,
+        offset: int,
+        length: int,
+        resume_hash: str,
+    ):
+        self.filename = filename
+        self.spool = spool
+        self.offset = offset
+        self.length = length
+        self.resume_hash = resume_hash
+
+    def read(self) -> bytes:
+        return self.spool.read(self.offset, self.length)
+
+
+class BatchOutcome(BaseModel):
+    filename: str
+    status: str
+    resume_id: str | None = None
+    error: dict | None = None
+
+
+def expand_upload_files(files: List[UploadFile]):
+    expanded: List[UploadFile] = []
+    outcomes: List[BatchOutcome] = []
+
+    for file in files:
+        if file.content_type not in ZIP_FILE_TYPES:
+            expanded.append(file)
+            continue
+
+        try:
+            archive = zipfile.ZipFile(file.file)
+        except zipfile.BadZipFile as e:
+            # one broken archive fails alone, the rest of the batch goes on
+            error = UnicornException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message=f"Invalid zip archive: {e}",
+                type="file.zip.invalid",
+            )
+            outcomes.append(_failed(file.filename, "invalid", error))
+            continue
+
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+
+            content_type = mimetypes.guess_type(info.filename)[0] or ""
+            expanded.append(
+                UploadFile(
+                    file=archive.open(info),
+                    size=info.file_size,
+                    filename=info.filename,
+                    headers=Headers({"content-type": content_type}),
+                )
+            )
+
+    return expanded, outcomes
+
+
+def prepare_batch(files: List[UploadFile], spool: BatchSpool):
+    items: List[BatchItem] = []
+    hashed_files = []
+
+    expanded, outcomes = expand_upload_files(files)
+    # hash every file while streaming it, then dedupe them with bulk lookups
+    for file in expanded:
+        isValid, error = validate_file(file)
+        if not isValid:
+            outcomes.append(_failed(file.filename, "invalid", error))
+            continue
+
+        try:
+            resume_hash = calculate_hash_stream(file.file)
+        except zipfile.BadZipFile as e:
+            # a corrupt archive member only shows up once it is read
+            outcomes.append(_failed(file.filename, "invalid", e))
+            continue
+
+        hashed_files.append((file, resume_hash))
+
+    duplicated_resumes = find_resumes_by_hashes([hash for _, hash in hashed_files])
+    seen_hashes = set()
+
+    for file, resume_hash in hashed_files:
+        if resume_hash in duplicated_resumes or resume_hash in seen_hashes:
+            outcomes.append(BatchOutcome(filename=file.filename, status="duplicated"))
+            continue
+
+        seen_hashes.add(resume_hash)
+        # uploads are closed once the request ends, before the job runs
+        offset, length = spool.add(file.file)
+        items.append(BatchItem(file.filename, spool, offset, length, resume_hash))
+
+    return items, outcomes
+
+
+async def run_batch(
+    items: List[BatchItem],
+    folder_id: str,
+    outcomes: List[BatchOutcome],
+    spool: BatchSpool,
+):
+    # CPU-bound stages (text extraction, rendering) run in the shared PDF process
+    # pool, the LLM and storage/DB calls in thread pools and the embedding model in
+    # its own thread, so every stage works on a different file at the same time
+    with ThreadPoolExecutor(PDF_POOL_WORKERS) as pdf_threads, ThreadPoolExecutor(
+        BATCH_LLM_WORKERS
+    ) as llm_pool, ThreadPoolExecutor(1) as embedding_pool, ThreadPoolExecutor(
+        BATCH_IO_WORKERS
+    ) as io_pool:
+        pools = pdf_threads, llm_pool, embedding_pool, io_pool
+        try:
+            results = await asyncio.gather(
+                *[process_batch_item(item, folder_id, pools) for item in items]
+            )
+        finally:
+            spool.close()
+
+    return [*outcomes, *results]
+
+
+def run_pdf_task(func, item: BatchItem):
+    return pdf_pool.run(func, item.read())
+
+
+def upload_batch_item(item: BatchItem, folder_id: str):
+    return upload_resume_file(item.read(), folder_id, item.resume_hash)
+
+
+async def process_batch_item(item: BatchItem, folder_id: str, pools):
+    pdf_threads, llm_pool, embedding_pool, io_pool = pools
+    loop = asyncio.get_running_loop()
+    uploading = False
+    thumbnail_url = None
+
+    try:
+        if THUMBNAIL_EAGER:
+            resume_data, thumbnails = await asyncio.gather(
+                parse_batch_item(item, pools),
+                loop.run_in_executor(
+                    pdf_threads, run_pdf_task, render_thumbnails, item
+                ),
+            )
+        else:
+            resume_data = await parse_batch_item(item, pools)
+
+        embeddings = await loop.run_in_executor(
+            embedding_pool, embed_resume_data, resume_data
+        )
+        uploading = True
+        resume_file_upload = loop.run_in_executor(
+            io_pool, upload_batch_item, item, folder_id
+        )
+        if THUMBNAIL_EAGER:
+            thumbnail_url, resume_file_path = await asyncio.gather(
+                loop.run_in_executor(
+                    io_pool, upload_thumbnails, thumbnails, folder_id, item.resume_hash
+                ),
+                resume_file_upload,
+            )
+        else:
+            resume_file_path = await resume_file_upload
+        resume_id = await loop.run_in_executor(
+            io_pool,
+            save_resume_data,
+            resume_data,
+            embeddings,
+            folder_id,
+            item.resume_hash,
+            resume_file_path,
+            thumbnail_url,
+        )
+    except Exception as e:
+        if uploading:
+            await loop.run_in_executor(
+                io_pool, remove_uploaded_files, folder_id, item.resume_hash
+            )
+        return _failed(item.filename, "failed", e)
+
+    return BatchOutcome(
+        filename=item.filename, status="saved", resume_id=str(resume_id)
+    )
+
+
+async def parse_batch_item(item: BatchItem, pools):
+    pdf_threads, llm_pool, embedding_pool, io_pool = pools
+    loop = asyncio.get_running_loop()
+
+    resume_data = await loop.run_in_executor(
+        io_pool, get_cached_resume_data, item.resume_hash
+    )
+    if resume_data is not None:
+        return resume_data
+
+    resume_content = await loop.run_in_executor(
+        pdf_threads, run_pdf_task, extract_resume_text, item
+    )
+
+    return await loop.run_in_executor(
+        llm_pool, extract_resume, resume_content, item.resume_hash
+    )
+
+
+def _failed(filename: str, status: str, error: Exception):
+    if isinstance(error, UnicornException):
+        detail = jsonable_encoder(error)
+    else:
+        detail = {"message": str(error), "type": type(error).__name__}
+
+    return BatchOutcome(filename=filename, status=status, error=detail)
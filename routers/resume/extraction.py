@@ -0,0 +1,73 @@
+import io
+import string
+from typing import BinaryIO, Iterator
+
+import pypdfium2 as pdfium
+
+from configs import env_configs
+
+# auto: text layer first, unstructured only when it is empty or garbled
+PDF_EXTRACTOR = env_configs.get("PDF_EXTRACTOR", "auto")
+MIN_TEXT_LAYER_CHARS = int(env_configs.get("MIN_TEXT_LAYER_CHARS", 200))
+MIN_TEXT_LAYER_READABLE_RATIO = 0.85
+
+READABLE_CHARS = set(string.punctuation + "•–—‘’“”…")
+
+
+def iter_text_layer_pages(resume_file: BinaryIO) -> Iterator[str]:
+    pdf = pdfium.PdfDocument(resume_file)
+    try:
+        for page in pdf:
+            text_page = page.get_textpage()
+            yield text_page.get_text_range()
+            text_page.close()
+            page.close()
+    finally:
+        pdf.close()
+
+
+def is_readable_text_layer(text: str) -> bool:
+    text = "".join(text.split())
+    if len(text) < MIN_TEXT_LAYER_CHARS:
+        return False
+
+    readable = sum(char.isalnum() or char in READABLE_CHARS for char in text)
+    return readable / len(text) >= MIN_TEXT_LAYER_READABLE_RATIO
+
+
+def extract_text_layer(resume_file: BinaryIO) -> str:
+    return "\n\n".join(iter_text_layer_pages(resume_file))
+
+
+def extract_unstructured(resume_file: BinaryIO) -> str:
+    # unstructured takes seconds to import, so only scanned/odd PDFs pay for it
+    from unstructured.partition.pdf import partition_pdf
+
+    resume_elements = partition_pdf(file=resume_file)
+    return "\n\n".join([str(el) for el in resume_elements])
+
+
+PDF_EXTRACTORS = {
+    "text_layer": extract_text_layer,
+    "unstructured": extract_unstructured,
+}
+
+
+def extract_pdf_text(resume_file: BinaryIO, extractor: str = PDF_EXTRACTOR) -> str:
+    if extractor != "auto":
+        return PDF_EXTRACTORS[extractor](resume_file)
+
+    try:
+        text = extract_text_layer(resume_file)
+    except pdfium.PdfiumError:
+        text = ""
+
+    if is_readable_text_layer(text):
+        return text
+
+    resume_file.seek(0)
+    return extract_unstructured(resume_file)
+
+
+def extract_resume_text(resume_bytes: bytes) -> str:
+    return extract_pdf_text(io.BytesIO(resume_bytes))
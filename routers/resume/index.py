@@ -0,0 +1,335 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from configs import env_configs
+from routers.resume.vectors import (
+    MATCH_THRESHOLD,
+    SEARCH_FIELDS,
+    decode_embeddings,
+    normalize_rows,
+    segment_max,
+)
+
+RESUME_INDEX_ENABLED = env_configs.get("RESUME_INDEX_ENABLED", "false") == "true"
+RESUME_INDEX_DIR = env_configs.get("RESUME_INDEX_DIR", ".resume_index")
+
+JOB_TITLE_COLUMN = "job_title_embedding"
+EMBEDDING_COLUMNS = [JOB_TITLE_COLUMN, *SEARCH_FIELDS.values()]
+
+
+def encode_embedding(vector: List[float]) -> str:
+    # the text pgvector returns, float32 values in their shortest form
+    return "[" + ",".join(map(str, np.asarray(vector, dtype=np.float32))) + "]"
+
+
+def write_file(path: Path, write: Callable):
+    with open(f"{path}.tmp", "wb") as file:
+        write(file)
+    os.replace(f"{path}.tmp", path)
+
+
+class FolderIndex:
+    # Exact (flat) index: per folder the candidate set is small enough that one
+    # BLAS matmul over contiguous, pre-normalized float32 rows beats ANN structures
+    # and gives the same matches as the match_jobtitles RPC.
+    # The embedding columns of the RPC rows are kept verbatim in embeddings.jsonl
+    # and only read back for the matched rows.
+    def __init__(
+        self,
+        rows: List[dict],
+        job_titles: np.ndarray,
+        fields: Dict[str, tuple[np.ndarray, np.ndarray]],
+        embedding_file,
+        embedding_offsets: np.ndarray,
+    ):
+        self.rows = rows
+        self.job_titles = job_titles
+        self.fields = fields
+        # an open handle keeps reading the version it was loaded with, even after
+        # a writer replaced the file
+        self.embedding_file = embedding_file
+        self.embedding_offsets = embedding_offsets
+
+    @staticmethod
+    def build(path: Path, resumes: List[dict], dimension: int):
+        if any(not resume.get(JOB_TITLE_COLUMN) for resume in resumes):
+            return False
+
+        rows = [
+            {
+                key: value
+                for key, value in resume.items()
+                if key not in EMBEDDING_COLUMNS
+            }
+            for resume in resumes
+        ]
+        embeddings = [
+            {key: value for key, value in resume.items() if key in EMBEDDING_COLUMNS}
+            for resume in resumes
+        ]
+        job_titles = decode_embeddings(
+            [resume[JOB_TITLE_COLUMN] for resume in resumes], dimension
+        )
+
+        arrays = {f"{JOB_TITLE_COLUMN}.npy": normalize_rows(job_titles)}
+        for column in SEARCH_FIELDS.values():
+            values = [
+                [item for item in resume.get(column) or [] if item]
+                for resume in resumes
+            ]
+            counts = [len(items) for items in values]
+            arrays[f"{column}_offsets.npy"] = np.concatenate(
+                ([0], np.cumsum(counts))
+            ).astype(np.int64)
+            arrays[f"{column}.npy"] = normalize_rows(
+                decode_embeddings(
+                    [item for items in values for item in items], dimension
+                )
+            )
+
+        lines = [json.dumps(embedding).encode() + b"\n" for embedding in embeddings]
+        arrays["embedding_offsets.npy"] = np.concatenate(
+            ([0], np.cumsum([len(line) for line in lines]))
+        ).astype(np.int64)
+
+        FolderIndex._write(path, rows, arrays, lambda file: file.writelines(lines))
+        return True
+
+    @classmethod
+    def load(cls, path: Path):
+        rows = json.loads((path / "rows.json").read_text())
+        job_titles = np.load(path / f"{JOB_TITLE_COLUMN}.npy", mmap_mode="r")
+        fields = {
+            column: (
+                np.load(path / f"{column}.npy", mmap_mode="r"),
+                np.load(path / f"{column}_offsets.npy"),
+            )
+            for column in SEARCH_FIELDS.values()
+        }
+
+        return cls(
+            rows,
+            job_titles,
+            fields,
+            open(path / "embeddings.jsonl", "rb"),
+            np.load(path / "embedding_offsets.npy"),
+        )
+
+    def append(
+        self,
+        path: Path,
+        row: dict,
+        embedding: dict,
+        job_title: List[float],
+        field_vectors: Dict[str, List[List[float]]],
+    ):
+        # a build that fetched the folder after this resume was saved has it already
+        if any(indexed.get("resume_id") == row["resume_id"] for indexed in self.rows):
+            return False
+
+        dimension = self.job_titles.shape[1]
+        row = {key: value for key, value in row.items() if key not in EMBEDDING_COLUMNS}
+        if self.rows:
+            # same columns as the match_jobtitles rows already in the index
+            row = {key: row.get(key) for key in self.rows[0]}
+        line = json.dumps(embedding).encode() + b"\n"
+
+        arrays = {
+            f"{JOB_TITLE_COLUMN}.npy": np.concatenate(
+                (
+                    self.job_titles,
+                    normalize_rows(np.asarray([job_title], dtype=np.float32)),
+                )
+            ),
+            "embedding_offsets.npy": np.append(
+                self.embedding_offsets, self.embedding_offsets[-1] + len(line)
+            ),
+        }
+        for column, (matrix, offsets) in self.fields.items():
+            vectors = np.asarray(field_vectors.get(column) or [], dtype=np.float32)
+            vectors = vectors.reshape(-1, dimension)
+            arrays[f"{column}.npy"] = np.concatenate((matrix, normalize_rows(vectors)))
+            arrays[f"{column}_offsets.npy"] = np.append(
+                offsets, offsets[-1] + len(vectors)
+            )
+
+        def write_embeddings(file):
+            self.embedding_file.seek(0)
+            shutil.copyfileobj(self.embedding_file, file)
+            file.write(line)
+
+        self._write(path, [*self.rows, row], arrays, write_embeddings)
+        return True
+
+    @staticmethod
+    def _write(path: Path, rows: List[dict], arrays: dict, write_embeddings: Callable):
+        # files are replaced atomically so mapped readers keep the old inode, and
+        # rows.json goes last because replacing it publishes the new version
+        path.mkdir(parents=True, exist_ok=True)
+        write_file(path / "embeddings.jsonl", write_embeddings)
+        for name, array in arrays.items():
+            write_file(path / name, lambda file: np.save(file, np.asarray(array)))
+        write_file(
+            path / "rows.json",
+            lambda file: file.write(json.dumps(rows, default=str).encode()),
+        )
+
+    def search(
+        self,
+        job_title_vector: np.ndarray,
+        match_threshold: float,
+        keyword_vectors: Dict[str, np.ndarray],
+    ) -> List[dict]:
+        query = normalize_rows(job_title_vector.reshape(1, -1))[0]
+        job_title_scores = self.job_titles @ query
+        keep = job_title_scores > match_threshold
+
+        for field, column in SEARCH_FIELDS.items():
+            query_vectors = keyword_vectors[field]
+            if not len(query_vectors) or not keep.any():
+                continue
+
+            matrix, offsets = self.fields[column]
+            scores = normalize_rows(query_vectors) @ matrix.T
+            keep &= (segment_max(scores, offsets) >= MATCH_THRESHOLD).all(axis=0)
+
+        matched = np.flatnonzero(keep)
+        matched = matched[np.argsort(-job_title_scores[matched], kind="stable")]
+
+        return [{**self.rows[i], **self._embedding(i)} for i in matched.tolist()]
+
+    def _embedding(self, i: int) -> dict:
+        start, end = self.embedding_offsets[i], self.embedding_offsets[i + 1]
+
+        return json.loads(
+            os.pread(self.embedding_file.fileno(), int(end - start), int(start))
+        )
+
+
+class ResumeIndexRegistry:
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.indexes: Dict[str, tuple[FolderIndex, tuple]] = {}
+        # folders whose match_jobtitles rows carry no job title embedding
+        self.unsupported = set()
+
+    def _folder_path(self, folder_id: str):
+        if not re.fullmatch(r"[\w-]+", folder_id):
+            return None
+
+        return self.directory / f"folder_{folder_id}"
+
+    @contextmanager
+    def _file_lock(self, path: Path, operation: int):
+        # One lock per folder: loads take it shared and writes exclusive. Every
+        # call opens its own descriptor, so it orders the threads of this worker
+        # as well as the other workers sharing RESUME_INDEX_DIR. The lock file
+        # sits next to the folder so it survives the folder being rebuilt.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def _version(self, path: Path):
+        try:
+            stat = (path / "rows.json").stat()
+        except FileNotFoundError:
+            return None
+
+        # every save replaces rows.json with a new file
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, folder_id: str, path: Path, fresh: bool = False):
+        # called with the folder's file lock held
+        cached = self.indexes.get(folder_id)
+        version = self._version(path)
+        if cached and cached[1] == version and not fresh:
+            return cached[0]
+
+        self.indexes.pop(folder_id, None)
+        if version is None:
+            return None
+
+        index = FolderIndex.load(path)
+        self.indexes[folder_id] = (index, version)
+        return index
+
+    def get_or_build(
+        self, folder_id: str, fetch_resumes: Callable[[], List[dict]], dimension: int
+    ):
+        path = self._folder_path(folder_id)
+        if path is None or folder_id in self.unsupported:
+            return None
+
+        # another worker may have rebuilt or extended the persisted index
+        with self._file_lock(path, fcntl.LOCK_SH):
+            index = self._load(folder_id, path)
+        if index is not None:
+            return index
+
+        # the folder is fetched without holding the lock; a resume saved while it
+        # runs leaves a pending marker and this build is dropped, the search falls
+        # back to the RPC and the next one builds again
+        pending = Path(f"{path}.pending")
+        with self._file_lock(path, fcntl.LOCK_EX):
+            pending.unlink(missing_ok=True)
+        resumes = fetch_resumes()
+
+        with self._file_lock(path, fcntl.LOCK_EX):
+            if self._version(path) is None:
+                if pending.exists():
+                    return None
+                if not FolderIndex.build(path, resumes, dimension):
+                    self.unsupported.add(folder_id)
+                    return None
+
+            return self._load(folder_id, path)
+
+    def add_resume(
+        self,
+        folder_id: str,
+        row: dict,
+        embedding: dict,
+        job_title: List[float],
+        field_vectors: Dict[str, List[List[float]]],
+    ):
+        path = self._folder_path(folder_id)
+        if path is None:
+            return
+
+        # load, append and save are one step for every worker, so concurrent
+        # uploads cannot overwrite each other's rows
+        with self._file_lock(path, fcntl.LOCK_EX):
+            index = self._load(folder_id, path, fresh=True)
+            if index is None:
+                # nothing built yet, the first search builds it lazily; a build
+                # fetching right now may have missed this resume
+                Path(f"{path}.pending").touch()
+                return
+
+            if index.append(path, row, embedding, job_title, field_vectors):
+                self._load(folder_id, path, fresh=True)
+
+    def invalidate(self, folder_id: str):
+        path = self._folder_path(folder_id)
+        self.indexes.pop(folder_id, None)
+        self.unsupported.discard(folder_id)
+        if path is None:
+            return
+
+        with self._file_lock(path, fcntl.LOCK_EX):
+            shutil.rmtree(path, ignore_errors=True)
+            Path(f"{path}.pending").unlink(missing_ok=True)
+            # the folder is gone, its lock file is not needed anymore
+            Path(f"{path}.lock").unlink(missing_ok=True)
+
+
+resume_index = ResumeIndexRegistry(RESUME_INDEX_DIR)
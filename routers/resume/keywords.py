@@ -0,0 +1,243 @@
+import asyncio
+import heapq
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Set
+
+import numpy as np
+
+from configs import env_configs
+from embedding_client.cache import normalize_text
+from embedding_client.main import embedding_engine
+from supabase_client.main import run_sync, supabase_client
+
+KEYWORD_TABLE_NAME = "keywords"
+KEYWORD_PAGE_SIZE = 1000
+KEYWORD_REFRESH_SECONDS = float(env_configs.get("KEYWORD_REFRESH_SECONDS", 300))
+KEYWORD_AUTOCOMPLETE_LIMIT = int(env_configs.get("KEYWORD_AUTOCOMPLETE_LIMIT", 20))
+# share of the query trigrams a keyword needs for a typo tolerant match
+FUZZY_MIN_SIMILARITY = 0.5
+MAX_PREFIX_CANDIDATES = 1000
+
+
+def fetch_keywords(after_keyword_id=None) -> List[dict]:
+    keywords = []
+
+    while True:
+        query = supabase_client.table(KEYWORD_TABLE_NAME).select(
+            "keyword_id, keyword_type, keyword_value"
+        )
+        if after_keyword_id is not None:
+            query = query.gt("keyword_id", after_keyword_id)
+
+        data, count = (query.order("keyword_id").limit(KEYWORD_PAGE_SIZE)).execute()
+        keywords += data[1]
+
+        if len(data[1]) < KEYWORD_PAGE_SIZE:
+            return keywords
+        after_keyword_id = data[1][-1]["keyword_id"]
+
+
+class KeywordVectors:
+    # keyword embeddings in one contiguous matrix, row i belongs to keyword_ids[i]
+    def __init__(self):
+        self.keyword_ids = []
+        self.rows = {}
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def add(self, keywords: List[dict]):
+        if not keywords:
+            return
+
+        vectors = embedding_engine.encode_many(
+            [keyword["keyword_value"] for keyword in keywords]
+        )
+
+        with self._lock:
+            start = len(self.keyword_ids)
+            matrix = vectors if not start else np.concatenate((self.matrix, vectors))
+            self.matrix = np.ascontiguousarray(matrix)
+            for row, keyword in enumerate(keywords, start):
+                self.keyword_ids.append(keyword["keyword_id"])
+                self.rows[normalize_text(keyword["keyword_value"])] = row
+
+    def lookup(self, value: str) -> np.ndarray | None:
+        row = self.rows.get(normalize_text(value))
+        if row is None:
+            return None
+
+        return self.matrix[row]
+
+
+def trigrams(text: str) -> Set[str]:
+    # padded per word like pg_trgm, so word starts and ends weigh more
+    return {
+        padded[i : i + 3]
+        for word in text.split()
+        for padded in [f"  {word} "]
+        for i in range(len(padded) - 2)
+    }
+
+
+class KeywordTypeIndex:
+    # Immutable index over the keywords of one type: words sorted for prefix
+    # lookups with bisect, and trigram posting lists for substring and typo
+    # tolerant matches.
+    def __init__(self, keywords: List[dict]):
+        self.keywords = keywords
+        self.keys = [normalize_text(keyword["keyword_value"]) for keyword in keywords]
+        self.sorted_rows = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.words = sorted(
+            (word, row)
+            for row, key in enumerate(self.keys)
+            for word in set(key.split())
+        )
+        self.word_keys = [word for word, _ in self.words]
+        postings = defaultdict(list)
+        trigram_counts = []
+        for row, key in enumerate(self.keys):
+            key_trigrams = trigrams(key)
+            trigram_counts.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                postings[trigram].append(row)
+        self.trigram_counts = np.asarray(trigram_counts, dtype=np.int32)
+        self.trigrams = {
+            trigram: np.asarray(rows, dtype=np.int32)
+            for trigram, rows in postings.items()
+        }
+
+    def search(self, value: str, limit: int) -> List[dict]:
+        query = normalize_text(value)
+        if not query:
+            return [self._result(row) for row in self.sorted_rows[:limit]]
+
+        # rank: exact, prefix, word prefix, substring, fuzzy; then similarity,
+        # shorter keywords first
+        ranks = {}
+        first_word = query.split()[0]
+        start = bisect_left(self.word_keys, first_word)
+        for word, row in self.words[start : start + MAX_PREFIX_CANDIDATES]:
+            if not word.startswith(first_word):
+                break
+
+            key = self.keys[row]
+            if key == query:
+                ranks[row] = (0, 0.0, len(key), key)
+            elif key.startswith(query):
+                ranks[row] = (1, 0.0, len(key), key)
+            elif f" {query}" in f" {key}":
+                ranks[row] = (2, 0.0, len(key), key)
+
+        # prefix matches always outrank the trigram matches
+        if len(ranks) < limit:
+            self._match_trigrams(query, ranks)
+
+        best = heapq.nsmallest(limit, ranks.items(), key=lambda item: item[1])
+        return [self._result(row) for row, _ in best]
+
+    def _match_trigrams(self, query: str, ranks: dict):
+        query_trigrams = trigrams(query)
+        postings = [self.trigrams[t] for t in query_trigrams if t in self.trigrams]
+        if not postings:
+            return
+
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        # a substring shares at least the inner trigrams of every query word
+        min_substring = max(sum(max(len(word) - 2, 0) for word in query.split()), 1)
+        min_fuzzy = FUZZY_MIN_SIMILARITY * len(query_trigrams)
+        similarities = shared / (len(query_trigrams) + self.trigram_counts - shared)
+
+        for row in np.flatnonzero(shared >= min(min_substring, min_fuzzy)).tolist():
+            if row in ranks:
+                continue
+
+            key = self.keys[row]
+            if query in key:
+                ranks[row] = (3, -similarities[row], len(key), key)
+            elif shared[row] >= min_fuzzy:
+                ranks[row] = (4, -similarities[row], len(key), key)
+
+    def _result(self, row: int):
+        keyword = self.keywords[row]
+
+        return {
+            "keyword_id": keyword["keyword_id"],
+            "keyword_value": keyword["keyword_value"],
+        }
+
+
+class KeywordAutocomplete:
+    # one index per keyword type, rebuilt off to the side and swapped in when
+    # that type gets new keywords so searches never wait on a refresh
+    def __init__(self):
+        self.keywords: Dict[str, List[dict]] = {}
+        self.indexes: Dict[str, KeywordTypeIndex] = {}
+        self._lock = threading.Lock()
+
+    def add(self, keywords: List[dict]):
+        keywords_by_type = defaultdict(list)
+        for keyword in keywords:
+            keywords_by_type[keyword["keyword_type"]].append(keyword)
+
+        with self._lock:
+            for keyword_type, new_keywords in keywords_by_type.items():
+                type_keywords = [*self.keywords.get(keyword_type, []), *new_keywords]
+                self.indexes[keyword_type] = KeywordTypeIndex(type_keywords)
+                self.keywords[keyword_type] = type_keywords
+
+    def search(self, keyword_type: str, value: str, limit: int) -> List[dict]:
+        index = self.indexes.get(keyword_type)
+        if index is None:
+            return []
+
+        return index.search(value, limit)
+
+
+class KeywordSync:
+    # Loads the keywords table into the in-memory structures at startup and then
+    # only fetches rows with a keyword_id above the last one seen.
+    def __init__(self, consumers: list, interval: float):
+        self.consumers = consumers
+        self.interval = interval
+        self.last_keyword_id = None
+        self.task: asyncio.Task | None = None
+
+    def load(self):
+        self._add(fetch_keywords())
+
+    def refresh(self):
+        self._add(fetch_keywords(self.last_keyword_id))
+
+    async def start(self):
+        if self.interval > 0:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def _add(self, keywords: List[dict]):
+        for consumer in self.consumers:
+            consumer.add(keywords)
+
+        if keywords:
+            self.last_keyword_id = keywords[-1]["keyword_id"]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_sync(self.refresh)
+            except Exception as e:
+                print("keyword refresh failed", e)
+
+
+keyword_vectors = KeywordVectors()
+keyword_autocomplete = KeywordAutocomplete()
+keyword_sync = KeywordSync(
+    [keyword_vectors, keyword_autocomplete], KEYWORD_REFRESH_SECONDS
+)
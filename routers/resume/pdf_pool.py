@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from fastapi import status
+
+from configs import env_configs
+from exception import UnicornException
+
+PDF_POOL_WORKERS = int(env_configs.get("PDF_POOL_WORKERS", os.cpu_count() or 1))
+PDF_TASK_TIMEOUT_SECONDS = float(env_configs.get("PDF_TASK_TIMEOUT_SECONDS", 60))
+# resubmits of a task whose pool was torn down for another task's timeout
+PDF_TASK_RETRIES = 2
+
+
+def warm_up_worker():
+    # heavy imports are paid once per worker process instead of per task; tasks
+    # live in modules that only need the PDF libraries
+    import pdf2image
+    import pypdfium2
+    import routers.resume.rendering
+    from routers.resume.extraction import PDF_EXTRACTOR
+
+    if PDF_EXTRACTOR != "text_layer":
+        import unstructured.partition.pdf
+
+
+class PdfProcessPool:
+    # Arguments are pickled once into the worker; PDFs travel as immutable bytes
+    # and io.BytesIO in the worker shares that buffer instead of copying it.
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor: ProcessPoolExecutor | None = None
+        # at most one task per worker is submitted, so the timeout only counts
+        # the time a task runs and never the time it waits in the queue
+        self.slots = threading.BoundedSemaphore(workers)
+        self.terminated = weakref.WeakSet()
+        self._lock = threading.RLock()
+
+    def start(self):
+        with self._lock:
+            if self.executor is None:
+                executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_up_worker,
+                )
+                # wait for warm workers so their start-up is not billed to a task
+                wait([executor.submit(os.getpid) for _ in range(self.workers)])
+                self.executor = executor
+
+            return self.executor
+
+    def shutdown(self):
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def run(self, func: Callable, *args):
+        for attempt in range(PDF_TASK_RETRIES + 1):
+            with self.slots:
+                # submitting under the lock keeps a restart from shutting the pool
+                # down between start() and submit()
+                with self._lock:
+                    executor = self.start()
+                    future = executor.submit(func, *args)
+
+                try:
+                    return future.result(timeout=self.timeout)
+                except TimeoutError:
+                    self._restart(executor, timed_out=True)
+                    raise UnicornException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        message=f"PDF processing took longer than {self.timeout} seconds",
+                        type="file.processing.timeout",
+                    )
+                except BrokenProcessPool:
+                    # the pool was terminated for another task's timeout, this task
+                    # did nothing wrong and runs again on the new pool
+                    if executor not in self.terminated or attempt == PDF_TASK_RETRIES:
+                        self._restart(executor)
+                        raise
+
+    def _restart(self, executor: ProcessPoolExecutor, timed_out: bool = False):
+        # a stuck worker cannot be cancelled, so the whole pool is replaced; tasks
+        # still running on it fail with BrokenProcessPool and are resubmitted
+        with self._lock:
+            if self.executor is not executor:
+                return
+
+            if timed_out:
+                self.terminated.add(executor)
+            for process in list(executor._processes.values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+pdf_pool = PdfProcessPool(PDF_POOL_WORKERS, PDF_TASK_TIMEOUT_SECONDS)
@@ -0,0 +1,52 @@
+import io
+from typing import Dict
+
+from pdf2image import convert_from_bytes
+from PIL.Image import LANCZOS, Image
+
+from configs import env_configs
+
+THUMBNAIL_WIDTHS = [
+    int(width) for width in env_configs.get("THUMBNAIL_WIDTHS", "480,240").split(",")
+]
+THUMBNAIL_FORMAT = env_configs.get("THUMBNAIL_FORMAT", "webp")
+THUMBNAIL_QUALITY = int(env_configs.get("THUMBNAIL_QUALITY", 80))
+
+
+def generate_thumbnails(pdf: bytes, firstPage=1, lastPage=1, width: int | None = None):
+    # poppler scales while rendering, no full-resolution page is ever produced
+    return convert_from_bytes(
+        pdf_file=pdf,
+        first_page=firstPage,
+        last_page=lastPage,
+        size=(width, None) if width else None,
+    )
+
+
+def convert_img_to_bytes(
+    image: Image, format: str = "PNG", quality: int = THUMBNAIL_QUALITY
+):
+    if format.upper() == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    image_BytesIO = io.BytesIO()
+    image.save(image_BytesIO, format=format.upper(), quality=quality)
+
+    return image_BytesIO.getvalue()
+
+
+def render_thumbnails(resume_bytes: bytes) -> Dict[int, bytes]:
+    # one render of the first page at the largest width, smaller sizes are
+    # downscaled from it
+    widths = sorted(THUMBNAIL_WIDTHS, reverse=True)
+    page = generate_thumbnails(pdf=resume_bytes, width=widths[0])[0]
+
+    thumbnails = {}
+    for width in widths:
+        if page.width > width:
+            page = page.resize(
+                (width, round(page.height * width / page.width)), LANCZOS
+            )
+        thumbnails[width] = convert_img_to_bytes(page, THUMBNAIL_FORMAT)
+
+    return thumbnails
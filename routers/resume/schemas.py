@@ -1,7 +1,7 @@
 from datetime import date as Date
 from enum import Enum
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class BasicInfo(BaseModel):
@@ -158,4 +158,8 @@ class SearchResume(BaseModel):
     certificates: List[KeywordOption]
     educations: List[KeywordOption]
     languages: List[KeywordOption]
-    skills: List[KeywordOption]
\ No newline at end of file
+    skills: List[KeywordOption]
+
+
+class ResumeUrlsRequest(BaseModel):
+    resume_ids: List[str] = Field(max_length=100)
@@ -0,0 +1,43 @@
+from typing import List
+
+import numpy as np
+
+from embedding_client.main import embedding_engine
+from routers.resume.keywords import keyword_vectors as known_keywords
+from routers.resume.schemas import SearchResume
+from routers.resume.vectors import SEARCH_FIELDS
+
+
+def embed_search_query(searchResume: SearchResume):
+    # only required keywords can filter a resume out, so optional ones are not embedded
+    required_values = {
+        field: [
+            option.value for option in getattr(searchResume, field) if option.required
+        ]
+        for field in SEARCH_FIELDS
+    }
+    texts = [searchResume.job_title]
+    for values in required_values.values():
+        texts += values
+
+    vectors = encode_search_texts(texts)
+
+    keyword_vectors = {}
+    start = 1
+    for field, values in required_values.items():
+        keyword_vectors[field] = vectors[start : start + len(values)]
+        start += len(values)
+
+    return vectors[0], keyword_vectors
+
+
+def encode_search_texts(texts: List[str]) -> np.ndarray:
+    # values picked from the keyword vocabulary already have a precomputed vector
+    vectors = [known_keywords.lookup(text) for text in texts]
+    missing_texts = [text for text, vector in zip(texts, vectors) if vector is None]
+
+    if missing_texts:
+        encoded = iter(embedding_engine.encode_many(missing_texts))
+        vectors = [next(encoded) if vector is None else vector for vector in vectors]
+
+    return np.stack(vectors)
@@ -1,14 +1,24 @@
 import hashlib
-import io
-from typing import BinaryIO, List
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager, suppress
+from typing import BinaryIO, Dict, List
+from urllib.parse import urlparse
 from fastapi import UploadFile, status
 from constants import (
+    API_PREFIX,
+    KB,
     MAX_SIZE_IN_MB,
+    RESUME_PREFIX,
+    RESUME_THUMBNAIL_PATH,
     RESUMES_BUCKET,
     SUPPORTED_FILE_TYPES,
     THUMBNAILS_BUCKET,
 )
-from openai_client.main import parseResume
+from openai_client.main import parseResume, parse_resume_cache_key
+from openai_client.parse_cache import parse_cache
 from routers.resume.schemas import (
     AwardRequest,
     CertificationRequest,
@@ -22,13 +32,34 @@ from routers.resume.schemas import (
     WorkExperienceRequest,
 )
 from supabase_client.main import get_storage_bucket, supabase_client
-from unstructured.partition.pdf import partition_pdf
-from pdf2image import convert_from_bytes
-from PIL.Image import Image
+from routers.resume.extraction import extract_pdf_text, extract_resume_text
+from routers.resume.pdf_pool import pdf_pool
+from routers.resume.rendering import (
+    THUMBNAIL_FORMAT,
+    THUMBNAIL_QUALITY,
+    THUMBNAIL_WIDTHS,
+    render_thumbnails,
+)
 
 from exception import UnicornException
 from supabase_client.table_names import *
-from sentence_transformers import SentenceTransformer
+from routers.resume.index import (
+    JOB_TITLE_COLUMN,
+    RESUME_INDEX_ENABLED,
+    encode_embedding,
+    resume_index,
+)
+from embedding_client.main import embedding_engine
+from response_cache.main import folder_tag, response_cache
+from configs import env_configs
+
+KNOWN_HASH_CACHE_SIZE = int(env_configs.get("KNOWN_HASH_CACHE_SIZE", 100000))
+KNOWN_HASH_CACHE_TTL = int(env_configs.get("KNOWN_HASH_CACHE_TTL", 600))
+DEDUPE_CHUNK_SIZE = 200
+# lazy thumbnails are rendered by GET /resume/{id}/thumbnail on first view
+THUMBNAIL_EAGER = env_configs.get("THUMBNAIL_EAGER", "false") == "true"
+API_BASE_URL = env_configs.get("API_BASE_URL", "")
+KNOWN_HASH_COLUMNS = ["resume_id", "resume_file_hash", "folder_id"]
 
 
 def validate_file(file: UploadFile):
@@ -63,29 +94,113 @@ def calculate_hash(file: bytes):
     return md5.hexdigest()
 
 
+def calculate_hash_stream(file: BinaryIO, chunk_size: int = 1024 * KB):
+    md5 = hashlib.md5()
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        md5.update(chunk)
+    file.seek(0)
+
+    return md5.hexdigest()
+
+
+class KnownHashCache:
+    # resume_file_hash -> short resume row, so repeated files skip the DB lookup.
+    # Entries expire because folders removed by other workers are not seen here.
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, hash: str):
+        with self._lock:
+            entry = self.rows.get(hash)
+            if entry is None:
+                return None
+
+            row, added_at = entry
+            if time.monotonic() - added_at > self.ttl:
+                del self.rows[hash]
+                return None
+
+            self.rows.move_to_end(hash)
+            return row
+
+    def add(self, row: dict):
+        with self._lock:
+            self.rows[row["resume_file_hash"]] = (row, time.monotonic())
+            self.rows.move_to_end(row["resume_file_hash"])
+            while len(self.rows) > self.max_size:
+                self.rows.popitem(last=False)
+
+    def discard_folder(self, folder_id: str):
+        with self._lock:
+            for hash, (row, added_at) in list(self.rows.items()):
+                if str(row.get("folder_id")) == str(folder_id):
+                    del self.rows[hash]
+
+
+known_resume_hashes = KnownHashCache(KNOWN_HASH_CACHE_SIZE, KNOWN_HASH_CACHE_TTL)
+
+
 def find_resume_by_hash(hash: str):
+    known_resume = known_resume_hashes.get(hash)
+    if known_resume:
+        return known_resume
+
+    # same columns as the cached rows, so callers see one shape either way
     res = (
         supabase_client.table(RESUME_TABLE_NAME)
-        .select("*")
+        .select(", ".join(KNOWN_HASH_COLUMNS))
         .eq("resume_file_hash", hash)
         .maybe_single()
         .execute()
     )
 
     if res:
+        known_resume_hashes.add(res.data)
         return res.data
 
     return None
 
 
+def find_resumes_by_hashes(hashes: List[str]) -> Dict[str, dict]:
+    found = {}
+    missing = []
+    for hash in dict.fromkeys(hashes):
+        known_resume = known_resume_hashes.get(hash)
+        if known_resume:
+            found[hash] = known_resume
+        else:
+            missing.append(hash)
+
+    for start in range(0, len(missing), DEDUPE_CHUNK_SIZE):
+        data, count = (
+            supabase_client.table(RESUME_TABLE_NAME)
+            .select(", ".join(KNOWN_HASH_COLUMNS))
+            .in_("resume_file_hash", missing[start : start + DEDUPE_CHUNK_SIZE])
+            .execute()
+        )
+        for row in data[1]:
+            known_resume_hashes.add(row)
+            found[row["resume_file_hash"]] = row
+
+    return found
+
+
 def get_resume_content(resume_file: BinaryIO):
-    resume_elements = partition_pdf(file=resume_file)
-    resume_content = "\n\n".join([str(el) for el in resume_elements])
+    return extract_pdf_text(resume_file)
 
-    return resume_content
 
+def get_cached_resume_data(resume_hash: str) -> ResumeData | None:
+    cached_resume_data = parse_cache.get(parse_resume_cache_key(resume_hash))
+    if cached_resume_data is None:
+        return None
 
-def extract_resume(resume_content: str) -> ResumeData:
+    return ResumeData.model_validate_json(cached_resume_data)
+
+
+def extract_resume(resume_content: str, resume_hash: str | None = None) -> ResumeData:
     if not resume_content:
         raise UnicornException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -102,44 +217,92 @@ def extract_resume(resume_content: str) -> ResumeData:
             type="file.not.resume",
         )
 
-    return ResumeData.model_validate_json(res.replace("```json", "").replace("```", ""))
+    resume_data = ResumeData.model_validate_json(
+        res.replace("```json", "").replace("```", "")
+    )
 
+    if resume_hash:
+        parse_cache.set(
+            parse_resume_cache_key(resume_hash), resume_data.model_dump_json()
+        )
 
-def generate_thumbnails(pdf: bytes, firstPage=0, lastPage=1):
-    return convert_from_bytes(pdf_file=pdf, first_page=firstPage, last_page=lastPage)
+    return resume_data
 
 
-def convert_img_to_bytes(image: Image):
-    image_BytesIO = io.BytesIO()
-    image.save(image_BytesIO, format="PNG")
+def get_thumbnail_path(fodler_id: int, resume_file_hash: str, width: int | None = None):
+    size_suffix = f"_{width}" if width and width != max(THUMBNAIL_WIDTHS) else ""
+
+    return (
+        f"folder_{fodler_id}/thumbnail_{resume_file_hash}{size_suffix}"
+        f".{THUMBNAIL_FORMAT}"
+    )
 
-    return image_BytesIO.getvalue()
 
+def validate_api_base_url():
+    # thumbnail urls are stored with the resume and loaded from the frontend
+    # origin, so they have to point at this API absolutely
+    url = urlparse(API_BASE_URL)
+    if url.scheme not in ("http", "https") or not url.netloc:
+        raise ValueError(
+            f"API_BASE_URL must be an absolute http(s) url, got {API_BASE_URL!r}"
+        )
 
-def upload_thumbnail(thumbnail: bytes, fodler_id: int, resume_file_hash: str):
+
+def get_thumbnail_endpoint(resume_id: str):
+    path = RESUME_THUMBNAIL_PATH.format(resume_id=resume_id)
+
+    return f"{API_BASE_URL.rstrip('/')}{API_PREFIX}{RESUME_PREFIX}{path}"
+
+
+def get_resume_file_path(fodler_id: int, resume_file_hash: str):
+    return f"folder_{fodler_id}/resume_{resume_file_hash}.pdf"
+
+
+def upload_thumbnails(
+    thumbnails: Dict[int, bytes], fodler_id: int, resume_file_hash: str
+):
     storage = get_storage_bucket(THUMBNAILS_BUCKET)
-    thumbnail_path = f"folder_{fodler_id}/thumbnail_{resume_file_hash}.png"
 
-    storage.upload(
-        file=thumbnail, path=thumbnail_path, file_options={"content-type": "image/png"}
-    )
+    for width, thumbnail in thumbnails.items():
+        storage.upload(
+            file=thumbnail,
+            path=get_thumbnail_path(fodler_id, resume_file_hash, width),
+            file_options={
+                "content-type": f"image/{THUMBNAIL_FORMAT}",
+                "cache-control": "31536000",
+                "x-upsert": "true",
+            },
+        )
 
-    return storage.get_public_url(thumbnail_path)
+    # the largest size is the one stored on the resume
+    return storage.get_public_url(get_thumbnail_path(fodler_id, resume_file_hash))
 
 
 def upload_resume_file(resume: bytes, fodler_id: int, resume_file_hash: str):
     storage = get_storage_bucket(RESUMES_BUCKET)
-    file_path = f"folder_{fodler_id}/resume_{resume_file_hash}.pdf"
+    file_path = get_resume_file_path(fodler_id, resume_file_hash)
 
     storage.upload(
         file=resume,
         path=file_path,
-        file_options={"content-type": "application/pdf"},
+        file_options={"content-type": "application/pdf", "x-upsert": "true"},
     )
 
     return file_path
 
 
+def remove_uploaded_files(fodler_id: int, resume_file_hash: str):
+    get_storage_bucket(THUMBNAILS_BUCKET).remove(
+        [
+            get_thumbnail_path(fodler_id, resume_file_hash, width)
+            for width in THUMBNAIL_WIDTHS
+        ]
+    )
+    get_storage_bucket(RESUMES_BUCKET).remove(
+        [get_resume_file_path(fodler_id, resume_file_hash)]
+    )
+
+
 def save_resume(request: ResumeRequest):
     data, count = (
         supabase_client.table(RESUME_TABLE_NAME)
@@ -162,100 +325,442 @@ def save_resume(request: ResumeRequest):
         )
         .execute()
     )
-    return data[1][0]["resume_id"]
+    return data[1][0]
+
 
+def update_resume_thumbnail_url(resume_id: str, thumbnail_url: str):
+    supabase_client.table(RESUME_TABLE_NAME).update(
+        {"resume_thumbnail_url": thumbnail_url}
+    ).eq("resume_id", resume_id).execute()
 
-def save_reference(request: ReferencesRequest):
+
+def save_references(requests: List[ReferencesRequest]):
     supabase_client.table(RESUME_REFERENCE_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "reference_link": request.reference_link,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "reference_link": request.reference_link,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_award(request: AwardRequest):
+def save_awards(requests: List[AwardRequest]):
     supabase_client.table(RESUME_AWARD_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "title": request.title,
-            "award_title_embedding": request.award_title_embedding,
-            "date": request.date,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "title": request.title,
+                "award_title_embedding": request.award_title_embedding,
+                "date": request.date,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_certification(request: CertificationRequest):
+def save_certifications(requests: List[CertificationRequest]):
     supabase_client.table(RESUME_CERTIFICATION_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "title": request.title,
-            "certification_embedding": request.certification_embedding,
-            "date": request.date,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "title": request.title,
+                "certification_embedding": request.certification_embedding,
+                "date": request.date,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_education(request: EducationRequest):
+def save_educations(requests: List[EducationRequest]):
     supabase_client.table(RESUME_EDUCATION_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "name": request.name,
-            "education_name_embedding": request.education_name_embedding,
-            "start_date": request.start_date,
-            "end_date": request.end_date,
-            "gpa": request.gpa,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "name": request.name,
+                "education_name_embedding": request.education_name_embedding,
+                "start_date": request.start_date,
+                "end_date": request.end_date,
+                "gpa": request.gpa,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_language(request: LanguageRequest):
+def save_languages(requests: List[LanguageRequest]):
     supabase_client.table(RESUME_LANGUAGE_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "language_name": request.language_name,
-            "language_name_embedding": request.language_name_embedding,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "language_name": request.language_name,
+                "language_name_embedding": request.language_name_embedding,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_project_experience(request: ProjectExperienceRequest):
+def save_project_experiences(requests: List[ProjectExperienceRequest]):
     supabase_client.table(RESUME_PROJECT_EXPERIENCE_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "project_name": request.project_name,
-            "project_description": request.project_description,
-            "project_technologies": request.project_technologies,
-            "responsibilities": request.responsibilities,
-            "repository_url": request.repository_url,
-            "demo_or_live_url": request.demo_or_live_url,
-            "start_date": request.start_date,
-            "end_date": request.end_date,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "project_name": request.project_name,
+                "project_description": request.project_description,
+                "project_technologies": request.project_technologies,
+                "responsibilities": request.responsibilities,
+                "repository_url": request.repository_url,
+                "demo_or_live_url": request.demo_or_live_url,
+                "start_date": request.start_date,
+                "end_date": request.end_date,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_skill(request: SkilRequest):
+def save_skills(requests: List[SkilRequest]):
     supabase_client.table(RESUME_SKILL_TABLE_NAME).insert(
-        {
-            "resume_id": request.resume_id,
-            "skill_name": request.skill_name,
-            "skill_name_embedding": request.skill_name_embedding,
-        }
+        [
+            {
+                "resume_id": request.resume_id,
+                "skill_name": request.skill_name,
+                "skill_name_embedding": request.skill_name_embedding,
+            }
+            for request in requests
+        ]
     ).execute()
 
 
-def save_work_experience(request: WorkExperienceRequest):
+def save_work_experiences(requests: List[WorkExperienceRequest]):
     supabase_client.table(RESUME_WORK_EXPERIENCE_TABLE_NAME).insert(
+        [
+            {
+                "resume_id": request.resume_id,
+                "job_title": request.job_title,
+                "job_sumary": request.job_sumary,
+                "company_name": request.company_name,
+                "start_date": request.start_date,
+                "end_date": request.end_date,
+            }
+            for request in requests
+        ]
+    ).execute()
+
+
+RESUME_CHILD_TABLE_NAMES = [
+    RESUME_REFERENCE_TABLE_NAME,
+    RESUME_AWARD_TABLE_NAME,
+    RESUME_CERTIFICATION_TABLE_NAME,
+    RESUME_EDUCATION_TABLE_NAME,
+    RESUME_LANGUAGE_TABLE_NAME,
+    RESUME_PROJECT_EXPERIENCE_TABLE_NAME,
+    RESUME_SKILL_TABLE_NAME,
+    RESUME_WORK_EXPERIENCE_TABLE_NAME,
+]
+
+
+def delete_resume(resume_id: str):
+    for table_name in RESUME_CHILD_TABLE_NAMES:
+        supabase_client.table(table_name).delete().eq("resume_id", resume_id).execute()
+
+    supabase_client.table(RESUME_TABLE_NAME).delete().eq(
+        "resume_id", resume_id
+    ).execute()
+
+
+def render_and_upload_thumbnails(
+    resume_bytes: bytes, folder_id: str, resume_hash: str
+) -> str:
+    thumbnails = pdf_pool.run(render_thumbnails, resume_bytes)
+
+    return upload_thumbnails(thumbnails, folder_id, resume_hash)
+
+
+class StageTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            # offsets from the pipeline start show which stages overlapped
+            self.stages[name] = {
+                "start": round(start - self.started, 3),
+                "end": round(end - self.started, 3),
+                "seconds": round(end - start, 3),
+            }
+
+    def timed(self, name: str, func):
+        def run(*args):
+            with self.stage(name):
+                return func(*args)
+
+        return run
+
+
+def process_resume(resume_bytes: bytes, folder_id: str, resume_hash: str):
+    # a retried job may find the resume saved by its previous attempt
+    saved_resume = find_resume_by_hash(resume_hash)
+    if saved_resume:
+        return {"resume_id": saved_resume["resume_id"]}
+
+    timer = StageTimer()
+
+    # storage uploads run in the background while the resume is parsed and embedded
+    with ThreadPoolExecutor(2) as storage_pool:
+        resume_file_upload = storage_pool.submit(
+            timer.timed("upload_resume_file", upload_resume_file),
+            resume_bytes,
+            folder_id,
+            resume_hash,
+        )
+        thumbnail_upload = (
+            storage_pool.submit(
+                timer.timed("thumbnail", render_and_upload_thumbnails),
+                resume_bytes,
+                folder_id,
+                resume_hash,
+            )
+            if THUMBNAIL_EAGER
+            else None
+        )
+        uploads = [
+            upload for upload in [resume_file_upload, thumbnail_upload] if upload
+        ]
+
+        try:
+            # a cached parse also skips text extraction
+            resume_data = get_cached_resume_data(resume_hash)
+
+            if resume_data is None:
+                with timer.stage("extract_text"):
+                    resume_content = pdf_pool.run(extract_resume_text, resume_bytes)
+
+                with timer.stage("parse"):
+                    resume_data = extract_resume(resume_content, resume_hash)
+
+            print("resume_data", resume_data)
+
+            with timer.stage("embed"):
+                embeddings = embed_resume_data(resume_data)
+
+            resume_file_path = resume_file_upload.result()
+            thumbnail_url = thumbnail_upload.result() if thumbnail_upload else None
+
+            with timer.stage("save"):
+                resume_id = save_resume_data(
+                    resume_data,
+                    embeddings,
+                    folder_id,
+                    resume_hash,
+                    resume_file_path,
+                    thumbnail_url,
+                )
+        except Exception:
+            wait(uploads)
+            remove_uploaded_files(folder_id, resume_hash)
+            raise
+
+    timer.stages["total"] = round(time.perf_counter() - timer.started, 3)
+
+    return {"resume_id": resume_id, "timings": timer.stages}
+
+
+def save_resume_data(
+    resume_data: ResumeData,
+    embeddings: Dict[str, List[float]],
+    folder_id: str,
+    resume_hash: str,
+    resume_file_path: str,
+    thumbnail_url: str,
+):
+    # save resume
+    resume_request = ResumeRequest(
+        resume_file_hash=resume_hash,
+        resume_file_path=resume_file_path,
+        resume_thumbnail_url=thumbnail_url,
+        folder_id=folder_id,
+        job_title=resume_data.basicInfo.jobTitle,
+        job_title_embedding=embeddings[resume_data.basicInfo.jobTitle or ""],
+        summary_or_objectives=resume_data.basicInfo.summaryOrObjectives,
+        full_name=resume_data.basicInfo.fullName,
+        email=resume_data.basicInfo.email,
+        phone_number=resume_data.basicInfo.phoneNumber,
+        address=resume_data.basicInfo.address,
+        tolal_years_experience=0,
+    )
+    resume_row = save_resume(resume_request)
+    resume_id = resume_row["resume_id"]
+    if thumbnail_url is None:
+        resume_request.resume_thumbnail_url = get_thumbnail_endpoint(resume_id)
+        resume_row["resume_thumbnail_url"] = resume_request.resume_thumbnail_url
+
+    reference_links = [
+        resume_data.basicInfo.linkedInMainPageUrl,
+        resume_data.basicInfo.githubMainPageUrl,
+        resume_data.basicInfo.portfolioMainPageUrl,
+    ]
+    references = [
+        ReferencesRequest(resume_id=resume_id, reference_link=link)
+        for link in reference_links
+        if link
+    ]
+    awards = [
+        AwardRequest(
+            resume_id=resume_id,
+            title=item.title,
+            award_title_embedding=embeddings[item.title or ""],
+            date=item.date,
+        )
+        for item in resume_data.awards or []
+    ]
+    certifications = [
+        CertificationRequest(
+            resume_id=resume_id,
+            title=item.title,
+            certification_embedding=embeddings[item.title or ""],
+            date=item.date,
+        )
+        for item in resume_data.certifications or []
+    ]
+    educations = [
+        EducationRequest(
+            resume_id=resume_id,
+            name=item.educationName,
+            education_name_embedding=embeddings[item.educationName or ""],
+            start_date=item.startDate,
+            end_date=item.endDate,
+            gpa=item.gpa,
+        )
+        for item in resume_data.educations or []
+    ]
+    work_experiences = [
+        WorkExperienceRequest(
+            resume_id=resume_id,
+            job_title=item.jobTitle,
+            job_sumary=item.jobSumary,
+            company_name=item.companyName,
+            start_date=item.startDate,
+            end_date=item.endDate,
+        )
+        for item in resume_data.workExperiences or []
+    ]
+    languages = [
+        LanguageRequest(
+            resume_id=resume_id,
+            language_name=item,
+            language_name_embedding=embeddings[item or ""],
+        )
+        for item in resume_data.languages or []
+    ]
+    project_experiences = [
+        ProjectExperienceRequest(
+            resume_id=resume_id,
+            project_name=item.projectName,
+            project_description=item.description,
+            project_technologies=item.technologies,
+            responsibilities=item.responsibilities,
+            repository_url=item.repositoryUrl,
+            demo_or_live_url=item.demoOrLiveUrl,
+            start_date=item.startDate,
+            end_date=item.endDate,
+        )
+        for item in resume_data.projectExperiences or []
+    ]
+    skills = [
+        SkilRequest(
+            resume_id=resume_id,
+            skill_name=item,
+            skill_name_embedding=embeddings[item or ""],
+        )
+        for item in resume_data.skills or []
+    ]
+
+    # one insert per child table; a failure removes everything written so far so
+    # a resume is never left half saved
+    try:
+        if thumbnail_url is None:
+            update_resume_thumbnail_url(resume_id, resume_request.resume_thumbnail_url)
+
+        for save, requests in [
+            (save_references, references),
+            (save_awards, awards),
+            (save_certifications, certifications),
+            (save_educations, educations),
+            (save_work_experiences, work_experiences),
+            (save_languages, languages),
+            (save_project_experiences, project_experiences),
+            (save_skills, skills),
+        ]:
+            if requests:
+                save(requests)
+    except Exception:
+        delete_resume(resume_id)
+        raise
+
+    # the resume is committed from here on, the caches and the index only speed
+    # things up and must not undo the save
+    known_resume_hashes.add(
         {
-            "resume_id": request.resume_id,
-            "job_title": request.job_title,
-            "job_sumary": request.job_sumary,
-            "company_name": request.company_name,
-            "start_date": request.start_date,
-            "end_date": request.end_date,
+            "resume_id": resume_id,
+            "resume_file_hash": resume_hash,
+            "folder_id": folder_id,
         }
-    ).execute()
+    )
+    try:
+        response_cache.invalidate(folder_tag(folder_id))
+    except Exception as e:
+        print("response cache invalidation failed", folder_id, e)
+
+    if RESUME_INDEX_ENABLED:
+        try:
+            field_vectors = {
+                "award_title_embedding": [
+                    item.award_title_embedding for item in awards
+                ],
+                "certification_embedding": [
+                    item.certification_embedding for item in certifications
+                ],
+                "education_name_embedding": [
+                    item.education_name_embedding for item in educations
+                ],
+                "language_name_embedding": [
+                    item.language_name_embedding for item in languages
+                ],
+                "skill_name_embedding": [item.skill_name_embedding for item in skills],
+            }
+            # rows and embedding columns in the form match_jobtitles returns them
+            resume_index.add_resume(
+                folder_id,
+                resume_row,
+                {
+                    JOB_TITLE_COLUMN: encode_embedding(
+                        resume_request.job_title_embedding
+                    ),
+                    **{
+                        column: [encode_embedding(vector) for vector in vectors]
+                        for column, vectors in field_vectors.items()
+                    },
+                },
+                resume_request.job_title_embedding,
+                field_vectors,
+            )
+        except Exception as e:
+            print("resume index update failed", folder_id, e)
+            # the next search rebuilds it with this resume
+            with suppress(Exception):
+                resume_index.invalidate(folder_id)
+
+    return resume_id
 
 
 def semantic_filter_resumes(year_query_embedding: List[float]):
@@ -273,6 +778,22 @@ def semantic_filter_resumes(year_query_embedding: List[float]):
 
 
 def embedding(text: str):
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    embedding = model.encode(text)
-    return embedding.tolist()
+    return embedding_engine.encode(text)
+
+
+def collect_resume_texts(resume_data: ResumeData) -> List[str]:
+    texts = [resume_data.basicInfo.jobTitle if resume_data.basicInfo else None]
+    texts += [item.title for item in resume_data.awards or []]
+    texts += [item.title for item in resume_data.certifications or []]
+    texts += [item.educationName for item in resume_data.educations or []]
+    texts += resume_data.languages or []
+    texts += resume_data.skills or []
+
+    return list(dict.fromkeys(text or "" for text in texts))
+
+
+def embed_resume_data(resume_data: ResumeData) -> Dict[str, List[float]]:
+    texts = collect_resume_texts(resume_data)
+    vectors = embedding_engine.encode_many(texts)
+
+    return {text: vector.tolist() for text, vector in zip(texts, vectors)}
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import re
+import shutil
+import threading
+from contextlib import suppress
+from pathlib import Path
+from typing import Dict
+
+from fastapi import status
+from storage3.utils import StorageException
+
+from configs import env_configs
+from constants import RESUMES_BUCKET, THUMBNAILS_BUCKET
+from exception import UnicornException
+from routers.resume.pdf_pool import pdf_pool
+from routers.resume.rendering import (
+    THUMBNAIL_FORMAT,
+    THUMBNAIL_QUALITY,
+    render_thumbnails,
+)
+from routers.resume.services import get_thumbnail_path, upload_thumbnails
+from supabase_client.main import get_storage_bucket, supabase_client
+from supabase_client.table_names import RESUME_TABLE_NAME
+
+THUMBNAIL_CACHE_DIR = env_configs.get("THUMBNAIL_CACHE_DIR", ".cache/thumbnails")
+THUMBNAIL_CACHE_MAX_BYTES = int(
+    env_configs.get("THUMBNAIL_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+THUMBNAIL_MAX_AGE = int(env_configs.get("THUMBNAIL_MAX_AGE", 604800))
+THUMBNAIL_LOCK_STRIPES = 64
+
+RESUME_ID_PATTERN = re.compile(r"[\w-]+")
+
+
+def find_resume_files(resume_id: str):
+    data, count = (
+        supabase_client.table(RESUME_TABLE_NAME)
+        .select("resume_id, folder_id, resume_file_hash, resume_file_path")
+        .eq("resume_id", resume_id)
+    ).execute()
+
+    if not data[1]:
+        raise UnicornException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message=f"Resume {resume_id} not found",
+            type="resume.not.found",
+        )
+
+    return data[1][0]
+
+
+def is_not_modified(if_none_match: str | None, etag: str):
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ThumbnailStore:
+    # Thumbnails are read from the local disk, then from the thumbnails bucket,
+    # and rendered from the stored PDF only when neither has them yet. Files sit
+    # in one directory per folder so a deleted folder drops its thumbnails.
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # concurrent first views of one resume render it once
+        self.locks = [threading.Lock() for _ in range(THUMBNAIL_LOCK_STRIPES)]
+        self.prune_lock = threading.Lock()
+        # bytes on disk as of the last scan plus what this worker wrote since
+        self.size = None
+
+    def resolve(self, resume_id: str):
+        # every response is checked against the resumes table, a deleted resume
+        # is a 404 even when its thumbnail is still cached
+        if not RESUME_ID_PATTERN.fullmatch(resume_id):
+            raise UnicornException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message=f"Resume {resume_id} not found",
+                type="resume.not.found",
+            )
+
+        return find_resume_files(resume_id)
+
+    def etag(self, resume: dict, width: int):
+        version = ":".join(
+            [
+                resume["resume_file_hash"],
+                str(width),
+                THUMBNAIL_FORMAT,
+                str(THUMBNAIL_QUALITY),
+            ]
+        )
+        return f'"{hashlib.md5(version.encode()).hexdigest()}"'
+
+    def get(self, resume: dict, width: int) -> bytes:
+        thumbnail = self._read(resume, width)
+        if thumbnail is not None:
+            return thumbnail
+
+        stripe = int(hashlib.md5(resume["resume_id"].encode()).hexdigest(), 16)
+        with self.locks[stripe % THUMBNAIL_LOCK_STRIPES]:
+            thumbnail = self._read(resume, width)
+            if thumbnail is not None:
+                return thumbnail
+
+            try:
+                thumbnails = {
+                    width: get_storage_bucket(THUMBNAILS_BUCKET).download(
+                        get_thumbnail_path(
+                            resume["folder_id"], resume["resume_file_hash"], width
+                        )
+                    )
+                }
+            except StorageException:
+                thumbnails = self._render(resume)
+
+            self._write(resume, thumbnails)
+
+        self._prune()
+        return thumbnails[width]
+
+    def discard_folder(self, folder_id: str):
+        if RESUME_ID_PATTERN.fullmatch(str(folder_id)):
+            shutil.rmtree(self._folder_path(folder_id), ignore_errors=True)
+
+    def _render(self, resume: dict) -> Dict[int, bytes]:
+        resume_bytes = get_storage_bucket(RESUMES_BUCKET).download(
+            resume["resume_file_path"]
+        )
+        thumbnails = pdf_pool.run(render_thumbnails, resume_bytes)
+        upload_thumbnails(thumbnails, resume["folder_id"], resume["resume_file_hash"])
+
+        return thumbnails
+
+    def _folder_path(self, folder_id):
+        return self.directory / f"folder_{folder_id}"
+
+    def _path(self, resume: dict, width: int):
+        return (
+            self._folder_path(resume["folder_id"])
+            / f"{resume['resume_id']}_{width}.{THUMBNAIL_FORMAT}"
+        )
+
+    def _read(self, resume: dict, width: int) -> bytes | None:
+        path = self._path(resume, width)
+        try:
+            thumbnail = path.read_bytes()
+            # the mtime is the last use, eviction drops the least recent first
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return thumbnail
+
+    def _write(self, resume: dict, thumbnails: Dict[int, bytes]):
+        for width, thumbnail in thumbnails.items():
+            path = self._path(resume, width)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(thumbnail)
+            os.replace(tmp_path, path)
+            if self.size is not None:
+                self.size += len(thumbnail)
+
+    def _scan(self):
+        files = []
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                with suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        return files
+
+    def _prune(self):
+        # the directory is only scanned again once this worker's estimate passes
+        # the bound, other workers writing to it are picked up by that scan
+        if self.size is not None and self.size <= self.max_bytes:
+            return
+        if not self.prune_lock.acquire(blocking=False):
+            return
+
+        try:
+            files = sorted(self._scan())
+            size = sum(file_size for _, file_size, _ in files)
+            # evict down to 90% so the next few writes do not scan again
+            for _, file_size, path in files:
+                if size <= self.max_bytes * 0.9:
+                    break
+                Path(path).unlink(missing_ok=True)
+                size -= file_size
+            self.size = size
+        except FileNotFoundError:
+            self.size = 0
+        finally:
+            self.prune_lock.release()
+
+
+thumbnail_store = ThumbnailStore(THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MAX_BYTES)
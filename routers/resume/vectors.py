@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MATCH_THRESHOLD = 0.64
+
+# SearchResume keyword field -> aggregated embedding column returned by match_jobtitles
+SEARCH_FIELDS = {
+    "awards": "award_title_embedding",
+    "certificates": "certification_embedding",
+    "educations": "education_name_embedding",
+    "languages": "language_name_embedding",
+    "skills": "skill_name_embedding",
+}
+
+
+def decode_embeddings(values: List[str], dimension: int) -> np.ndarray:
+    # pgvector text ("[0.1,0.2,...]") is parsed in one pass over all values
+    if not values:
+        return np.empty((0, dimension), dtype=np.float32)
+
+    if not isinstance(values[0], str):
+        return np.asarray(values, dtype=np.float32)
+
+    text = ",".join(value.strip("[] ") for value in values)
+    return np.fromstring(text, dtype=np.float32, sep=",").reshape(len(values), -1)
+
+
+def stack_field_embeddings(
+    resumes: List[dict], column: str, dimension: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    values = [[item for item in resume.get(column) or [] if item] for resume in resumes]
+    counts = [len(items) for items in values]
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    matrix = decode_embeddings([item for items in values for item in items], dimension)
+
+    return np.ascontiguousarray(matrix), offsets
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def segment_max(scores: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    starts = offsets[:-1]
+    non_empty = np.diff(offsets) > 0
+
+    result = np.full((scores.shape[0], len(starts)), -np.inf, dtype=np.float32)
+    if scores.shape[1]:
+        result[:, non_empty] = np.maximum.reduceat(scores, starts[non_empty], axis=1)
+
+    return result
+
+
+def match_keywords(
+    query_vectors: np.ndarray, matrix: np.ndarray, offsets: np.ndarray
+) -> np.ndarray:
+    scores = normalize_rows(query_vectors) @ normalize_rows(matrix).T
+
+    return segment_max(scores, offsets) >= MATCH_THRESHOLD
+
+
+def filter_resumes(
+    resumes: List[dict], keyword_vectors: Dict[str, np.ndarray]
+) -> List[dict]:
+    keep = np.ones(len(resumes), dtype=bool)
+
+    for field, column in SEARCH_FIELDS.items():
+        query_vectors = keyword_vectors[field]
+        if not len(query_vectors) or not keep.any():
+            continue
+
+        matrix, offsets = stack_field_embeddings(
+            resumes, column, query_vectors.shape[1]
+        )
+        keep &= match_keywords(query_vectors, matrix, offsets).all(axis=0)
+
+    return [resume for resume, kept in zip(resumes, keep) if kept]
@@ -3,7 +3,8 @@ from fastapi.encoders import jsonable_encoder
 from exception import UnicornException
 from routers.user.schemes import LoginPayload
 from schemas import PageParams, PagedResponseSchema
-from supabase_client.main import supabase_client
+from routers.user.services import sign_in
+from supabase_client.main import run_sync
 
 from tags import AUTH_TAG
 
@@ -16,9 +17,7 @@ userRouter = APIRouter(prefix="/user")
 )
 async def login(payload: LoginPayload):
     try:
-        return supabase_client.auth.sign_in_with_password(
-            {"email": payload.email, "password": payload.password}
-        )
+        return await run_sync(sign_in, payload.email, payload.password)
     except:
         raise UnicornException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -4,3 +4,10 @@ from pydantic import BaseModel
 class LoginPayload(BaseModel):
     email: str
     password: str
+
+
+class UserContext(BaseModel):
+    id: str
+    email: str | None = None
+    role: str | None = None
+    access_token: str
@@ -0,0 +1,110 @@
+import jwt
+from fastapi import Depends, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from gotrue import SyncGoTrueClient
+from gotrue.http_clients import SyncClient
+
+from configs import env_configs
+from exception import UnicornException
+from routers.user.schemes import UserContext
+from supabase_client.main import SUPABASE_TIMEOUT, key, supabase_client, url
+
+SUPABASE_JWT_SECRET = env_configs.get("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = env_configs.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_CACHE_SECONDS = int(env_configs.get("SUPABASE_JWKS_CACHE_SECONDS", 600))
+JWT_LEEWAY_SECONDS = int(env_configs.get("JWT_LEEWAY_SECONDS", 10))
+JWKS_ALGORITHMS = {"RS256", "ES256"}
+
+SUPABASE_AUTH_HEADERS = {
+    **supabase_client.options.headers,
+    "apiKey": key,
+    "Authorization": f"Bearer {key}",
+}
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# asymmetric signing keys are fetched once and reused until the lifespan expires
+jwks_client = jwt.PyJWKClient(
+    f"{url}/auth/v1/.well-known/jwks.json",
+    cache_keys=True,
+    lifespan=SUPABASE_JWKS_CACHE_SECONDS,
+    headers={"apiKey": key},
+)
+
+auth_http_client = SyncClient(timeout=SUPABASE_TIMEOUT)
+
+
+def unauthorized(message: str):
+    return UnicornException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        message=message,
+        type="user.unauthorized",
+    )
+
+
+def get_signing_key(token: str):
+    algorithm = jwt.get_unverified_header(token).get("alg")
+
+    if algorithm == "HS256" and SUPABASE_JWT_SECRET:
+        return SUPABASE_JWT_SECRET, algorithm
+
+    if algorithm in JWKS_ALGORITHMS:
+        return jwks_client.get_signing_key_from_jwt(token).key, algorithm
+
+    raise unauthorized(f"Unsupported token algorithm: {algorithm}")
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> UserContext:
+    # the token is verified locally, no request goes to the auth server
+    if credentials is None:
+        raise unauthorized("Missing bearer token")
+
+    token = credentials.credentials
+    try:
+        signing_key, algorithm = get_signing_key(token)
+        claims = jwt.decode(
+            token,
+            signing_key,
+            algorithms=[algorithm],
+            audience=SUPABASE_JWT_AUDIENCE,
+            leeway=JWT_LEEWAY_SECONDS,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.PyJWTError as e:
+        raise unauthorized(f"Invalid token: {e}")
+
+    return UserContext(
+        id=claims["sub"],
+        email=claims.get("email"),
+        role=claims.get("role"),
+        access_token=token,
+    )
+
+
+def get_optional_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> UserContext | None:
+    # public endpoints still scope per-user data, e.g. cache keys, by a valid token
+    if credentials is None:
+        return None
+
+    try:
+        return get_current_user(credentials)
+    except UnicornException:
+        return None
+
+
+def sign_in(email: str, password: str):
+    # a client per sign in keeps sessions of different users apart, they only
+    # share the HTTP connection pool
+    auth_client = SyncGoTrueClient(
+        url=f"{url}/auth/v1",
+        headers=SUPABASE_AUTH_HEADERS,
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=auth_http_client,
+    )
+
+    return auth_client.sign_in_with_password({"email": email, "password": password})
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import Generic, List, TypeVar
 from pydantic import BaseModel, conint
 
@@ -5,14 +6,25 @@ from pydantic import BaseModel, conint
 class PageParams(BaseModel):
     page: conint(ge=1) = 1
     size: conint(ge=1, le=100) = 10
+    # nextCursor of the previous page, switches from offset to keyset paging
+    cursor: str | None = None
+
+
+class CountMode(str, Enum):
+    exact = "exact"
+    planned = "planned"
+    estimated = "estimated"
+    cached = "cached"
+    none = "none"
 
 
 T = TypeVar("T")
 
 
 class PagedResponseSchema(BaseModel, Generic[T]):
-    totalPages: int
-    totalElements: int
+    totalPages: int | None
+    totalElements: int | None
     page: int
     size: int
     results: List[T]
+    nextCursor: str | None = None
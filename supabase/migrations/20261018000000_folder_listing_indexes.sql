@@ -0,0 +1,12 @@
+-- Indexed search and keyset paging for GET /folder/all.
+
+create extension if not exists pg_trgm;
+
+-- serves folder_name ilike '%value%', including leading wildcards
+create index if not exists folders_folder_name_trgm_idx
+    on folders using gin (folder_name gin_trgm_ops);
+
+-- keyset pages are read in folder_id order through the primary key; keep the
+-- planner statistics fresh so count=planned/estimated stay close
+alter table folders alter column folder_name set statistics 1000;
+analyze folders;
@@ -1,3 +1,8 @@
+from typing import Callable, Dict, Union
+
+import anyio
+import httpx
+from postgrest import AsyncPostgrestClient
 from supabase import create_client, Client
 from configs import env_configs
 from constants import BUCKET_NAME
@@ -5,8 +10,70 @@ from constants import BUCKET_NAME
 url: str = env_configs.get("SUPABASE_URL")
 key: str = env_configs.get("SUPABASE_KEY")
 
+SUPABASE_POOL_SIZE = int(env_configs.get("SUPABASE_POOL_SIZE", 20))
+SUPABASE_KEEPALIVE_SECONDS = float(env_configs.get("SUPABASE_KEEPALIVE_SECONDS", 30))
+SUPABASE_TIMEOUT = float(env_configs.get("SUPABASE_TIMEOUT", 10))
+SUPABASE_CONNECT_TIMEOUT = float(env_configs.get("SUPABASE_CONNECT_TIMEOUT", 5))
+SUPABASE_THREAD_LIMIT = int(env_configs.get("SUPABASE_THREAD_LIMIT", 40))
+
 supabase_client: Client = create_client(url, key)
 
 
 def get_storage_bucket(bucket_name: str = BUCKET_NAME):
     return supabase_client.storage.from_(bucket_name)
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    # one keep-alive connection pool shared by every request of the worker
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, httpx.Timeout],
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_POOL_SIZE,
+                max_keepalive_connections=SUPABASE_POOL_SIZE,
+                keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS,
+            ),
+        )
+
+
+async_supabase_client = PooledPostgrestClient(
+    f"{url}/rest/v1",
+    headers={
+        **supabase_client.options.headers,
+        "apiKey": key,
+        "Authorization": f"Bearer {key}",
+    },
+    timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+)
+
+
+def as_user(query, access_token: str | None):
+    # the shared session sends the service key, a per-query header lets row level
+    # security see the caller instead
+    if access_token:
+        query.headers["Authorization"] = f"Bearer {access_token}"
+    return query
+
+
+_thread_limiter: anyio.CapacityLimiter | None = None
+
+
+async def run_sync(func: Callable, *args):
+    # storage and auth calls stay on the sync client, they run in their own
+    # bounded set of threads so they cannot starve the default threadpool
+    global _thread_limiter
+    if _thread_limiter is None:
+        _thread_limiter = anyio.CapacityLimiter(SUPABASE_THREAD_LIMIT)
+
+    return await anyio.to_thread.run_sync(func, *args, limiter=_thread_limiter)
+
+
+async def close_async_clients():
+    await async_supabase_client.aclose()
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+from configs import env_configs
+from supabase_client.main import get_storage_bucket
+
+SIGNED_URL_EXPIRES_IN = int(env_configs.get("SIGNED_URL_EXPIRES_IN", 3600 * 24))
+SIGNED_URL_REFRESH_MARGIN = int(env_configs.get("SIGNED_URL_REFRESH_MARGIN", 3600))
+SIGNED_URL_CACHE_SIZE = int(env_configs.get("SIGNED_URL_CACHE_SIZE", 10000))
+
+
+class SignedUrlCache:
+    # (bucket, path) -> (signed url, expires_at). A url is reused until less than
+    # refresh_margin of its validity is left, so clients never get one that is
+    # about to expire.
+    def __init__(self, expires_in: int, refresh_margin: int, max_size: int):
+        self.expires_in = expires_in
+        self.refresh_margin = refresh_margin
+        self.max_size = max_size
+        self.urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bucket_name: str, path: str) -> str:
+        # a single resume with no stored file is an error, unlike a page of urls
+        url = self._get_cached(bucket_name, path)
+        if url is None:
+            expires_at = time.time() + self.expires_in
+            url = get_storage_bucket(bucket_name).create_signed_url(
+                path, self.expires_in
+            )["signedURL"]
+            with self._lock:
+                self._remember((bucket_name, path), url, expires_at)
+
+        return url
+
+    def get_many(self, bucket_name: str, paths: List[str]) -> Dict[str, str | None]:
+        urls = {path: self._get_cached(bucket_name, path) for path in paths}
+        missing = [path for path, url in urls.items() if url is None]
+
+        if missing:
+            expires_at = time.time() + self.expires_in
+            signed_urls = self._sign(bucket_name, missing)
+            with self._lock:
+                for path, url in signed_urls.items():
+                    if url:
+                        self._remember((bucket_name, path), url, expires_at)
+            urls.update(signed_urls)
+
+        return urls
+
+    def _sign(self, bucket_name: str, paths: List[str]) -> Dict[str, str | None]:
+        bucket = get_storage_bucket(bucket_name)
+        if len(paths) == 1:
+            return {paths[0]: self._sign_one(bucket, paths[0])}
+
+        try:
+            # one storage request for the whole page
+            signed = bucket.create_signed_urls(paths, self.expires_in)
+            return {item["path"]: item["signedURL"] for item in signed}
+        except (AttributeError, TypeError):
+            # storage3 fails the whole batch when one path has no object
+            return {path: self._sign_one(bucket, path) for path in paths}
+
+    def _sign_one(self, bucket, path: str):
+        try:
+            return bucket.create_signed_url(path, self.expires_in)["signedURL"]
+        except Exception:
+            return None
+
+    def _get_cached(self, bucket_name: str, path: str):
+        with self._lock:
+            entry = self.urls.get((bucket_name, path))
+            if entry is None:
+                return None
+
+            url, expires_at = entry
+            if expires_at - time.time() < self.refresh_margin:
+                del self.urls[(bucket_name, path)]
+                return None
+
+            self.urls.move_to_end((bucket_name, path))
+            return url
+
+    def _remember(self, key: tuple, url: str, expires_at: float):
+        self.urls[key] = (url, expires_at)
+        self.urls.move_to_end(key)
+        while len(self.urls) > self.max_size:
+            self.urls.popitem(last=False)
+
+
+signed_urls = SignedUrlCache(
+    SIGNED_URL_EXPIRES_IN, SIGNED_URL_REFRESH_MARGIN, SIGNED_URL_CACHE_SIZE
+)
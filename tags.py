@@ -1,3 +1,4 @@
 RESUME_TAG = "Resume API"
 FOLDER_TAG = "Folder API"
 AUTH_TAG = "User API"
+HEALTH_TAG = "Health API"